@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : bench_api.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+""" Load test of the JSON API on localhost: runs the server in a separate
+process, then keeps CONNECTIONS kept alive connections busy for SECONDS,
+one request in ten adding a phone number, and reports the requests per
+second and the latencies.
+
+    python3 Benchmarks/bench_api.py [NB_CONTACTS] [CONNECTIONS] [SECONDS]
+"""
+
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import logging
+import tempfile
+import multiprocessing
+
+import synthetic
+
+from tact.api import ApiServer
+from tact.core import AddressBookManager
+from tact.storage import CsvBackend
+
+# Share of the requests adding a phone number
+WRITE_RATIO = 0.1
+
+
+def run_server(data_dir, ports):
+    """ Run an API server on the book of data_dir, on a free port sent
+    through the ports queue. """
+    logging.disable(logging.CRITICAL)
+    AddressBookManager.DATA_DIR = data_dir
+    AddressBookManager.BACKEND = 'csv'
+
+    async def serve():
+        server = ApiServer(AddressBookManager.make_address_book())
+        http = await server.start('127.0.0.1', 0)
+        ports.put(http.sockets[0].getsockname()[1])
+        async with http:
+            await http.serve_forever()
+
+    asyncio.run(serve())
+
+
+async def request(reader, writer, method, path, body=b''):
+    """ Send a request on a kept alive connection. Gets its status. """
+    writer.write(
+        "{} {} HTTP/1.1\r\nContent-Length: {}\r\n\r\n".format(
+            method, path, len(body)).encode('latin-1') + body)
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line == b'\r\n':
+            break
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':')[1])
+    await reader.readexactly(length)
+
+    return status
+
+
+async def client(port, names, deadline, latencies, seed):
+    """ Send requests until deadline, appending their latencies to the read
+    or the write list of latencies. """
+    rand = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while time.perf_counter() < deadline:
+            firstname, lastname = rand.choice(names)
+            path = "/contacts/{}/{}".format(firstname, lastname)
+            start = time.perf_counter()
+            if rand.random() < WRITE_RATIO:
+                body = json.dumps({'phone': "06{:08d}".format(
+                    rand.randrange(10 ** 8))}).encode('utf-8')
+                await request(reader, writer, 'POST', path + '/phones', body)
+                latencies['write'].append(time.perf_counter() - start)
+            else:
+                await request(reader, writer, 'GET', path)
+                latencies['read'].append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+def percentile(values, ratio):
+    """ Gets the value below which ratio of the sorted values are. """
+    if not values:
+        return 0.0
+
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+def main():
+    nb_contacts = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+    logging.disable(logging.CRITICAL)
+
+    data_dir = tempfile.mkdtemp()
+    server = None
+    try:
+        address_book = synthetic.make_address_book(nb_contacts)
+        names = list(address_book.book)
+        CsvBackend(data_dir).write_snapshot(address_book)
+        del address_book
+
+        ports = multiprocessing.Queue()
+        server = multiprocessing.Process(
+            target=run_server, args=(data_dir, ports), daemon=True)
+        server.start()
+        port = ports.get(timeout=120)
+
+        latencies = {'read': [], 'write': []}
+        deadline = time.perf_counter() + seconds
+
+        async def load():
+            await asyncio.gather(*(
+                client(port, names, deadline, latencies, seed)
+                for seed in range(connections)))
+
+        start = time.perf_counter()
+        asyncio.run(load())
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+        shutil.rmtree(data_dir)
+
+    nb_requests = len(latencies['read']) + len(latencies['write'])
+    print("{} contacts, {} connections, {:.1f} s".format(
+        nb_contacts, connections, elapsed))
+    print("Requests : {:.0f} requests/s".format(nb_requests / elapsed))
+    for kind in ('read', 'write'):
+        values = sorted(latencies[kind])
+        print("{:5} : {} requests, p50 {:.2f} ms, p99 {:.2f} ms".format(
+            kind.capitalize(), len(values),
+            percentile(values, 0.5) * 1000, percentile(values, 0.99) * 1000))
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF
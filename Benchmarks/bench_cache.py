@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : bench_cache.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+""" Compares the startup time of an address book loaded from tact.csv with
+the one loaded from the binary cache.
+
+    python3 Benchmarks/bench_cache.py [NB_CONTACTS]
+"""
+
+import sys
+import time
+import shutil
+import logging
+import tempfile
+
+import synthetic
+
+from tact.storage import CsvBackend
+
+
+def best_of(function, repeat=3):
+    """ Gets the best execution time of function, in seconds. """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main():
+    nb_contacts = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    logging.disable(logging.CRITICAL)
+
+    data_dir = tempfile.mkdtemp()
+    try:
+        backend = CsvBackend(data_dir, journal=False, cache=True)
+        backend.write_snapshot(synthetic.make_address_book(nb_contacts))
+
+        backend.cache = False
+        csv_time = best_of(backend.make_address_book)
+
+        backend.cache = True
+        cache_time = best_of(backend.make_address_book)
+    finally:
+        shutil.rmtree(data_dir)
+
+    print("{} contacts".format(nb_contacts))
+    print("CSV parsing  : {:.3f} s".format(csv_time))
+    print("Binary cache : {:.3f} s".format(cache_time))
+    print("Speedup      : {:.1f}x".format(csv_time / cache_time))
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : bench_checker.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+""" Compares the validation of the phones and emails of tact.csv one value
+at a time, with raw pattern strings, to the batch API of ContactChecker, then
+times the load of tact.csv without the binary cache.
+
+    python3 Benchmarks/bench_checker.py [NB_CONTACTS]
+"""
+
+import re
+import sys
+import time
+import shutil
+import logging
+import tempfile
+
+import synthetic
+
+from tact.core import ContactChecker
+from tact.storage import CsvBackend
+
+
+def best_of(function, repeat=3):
+    """ Gets the best execution time of function, in seconds. """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def check_one_by_one(rows):
+    """ Validate rows as ContactChecker used to, one re.search per value. """
+    for emails, phones in rows:
+        [phone for phone in phones
+         if re.search(ContactChecker.PHONE_RE, phone) is not None]
+        [email for email in emails
+         if re.search(ContactChecker.EMAIL_RE, email) is not None]
+
+
+def check_batch(rows):
+    """ Validate rows with the batch API of ContactChecker. """
+    failures = []
+    for emails, phones in rows:
+        ContactChecker.check_phones(phones, failures)
+        ContactChecker.check_emails(emails, failures)
+
+
+def main():
+    nb_contacts = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    logging.disable(logging.CRITICAL)
+
+    rows = [
+        (row[3].split('|') if row[3] else [],
+         row[4].split('|') if row[4] else [])
+        for row in synthetic.make_rows(nb_contacts)]
+    one_by_one_time = best_of(lambda: check_one_by_one(rows))
+    batch_time = best_of(lambda: check_batch(rows))
+
+    data_dir = tempfile.mkdtemp()
+    try:
+        backend = CsvBackend(data_dir, journal=False, cache=False)
+        backend.write_snapshot(synthetic.make_address_book(nb_contacts))
+        load_time = best_of(backend.make_address_book)
+    finally:
+        shutil.rmtree(data_dir)
+
+    print("{} contacts".format(nb_contacts))
+    print("One by one checks : {:.3f} s".format(one_by_one_time))
+    print("Batch checks      : {:.3f} s".format(batch_time))
+    print("Speedup           : {:.1f}x".format(one_by_one_time / batch_time))
+    print("CSV load          : {:.3f} s".format(load_time))
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF
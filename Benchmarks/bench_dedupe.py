@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : bench_dedupe.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+""" Times the search of duplicates in synthetic address books (see
+synthetic.py) of growing sizes, one contact out of DUPLICATE_EVERY being
+entered twice with another case and spacing of its name. The candidate pairs
+and the time should grow about linearly with the number of contacts, where
+comparing every pair would grow with its square. The synthetic emails are
+drawn from a small set, so that their blocks (and the pairs) grow faster at
+the larger sizes than in a real book.
+
+    python3 Benchmarks/bench_dedupe.py [SIZES] [DUPLICATE_EVERY]
+"""
+
+import sys
+import time
+import logging
+
+import synthetic
+
+from tact import dedupe
+from tact.core import Contact
+
+
+def make_address_book(nb_contacts, duplicate_every):
+    """ Build a synthetic address book with one duplicate every
+    duplicate_every contacts. Gets it with the number of duplicates. """
+    address_book = synthetic.make_address_book(nb_contacts)
+    contacts = list(address_book.book.values())[::duplicate_every]
+    for contact in contacts:
+        address_book.append_contact(Contact(
+            contact.firstname.upper(), " {} ".format(contact.lastname),
+            "", [], list(contact.phones[:1]), check=False))
+
+    return address_book, len(contacts)
+
+
+def main():
+    sizes = sys.argv[1] if len(sys.argv) > 1 else '1000,10000,100000'
+    duplicate_every = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    logging.disable(logging.CRITICAL)
+
+    print("{:>8} {:>10} {:>10} {:>10} {:>10}".format(
+        "Contacts", "Injected", "Pairs", "Found", "Time (s)"))
+    for size in [int(size) for size in sizes.split(',')]:
+        address_book, injected = make_address_book(size, duplicate_every)
+        pairs, _ = dedupe.candidate_pairs(address_book.book.values())
+        start = time.perf_counter()
+        duplicates = dedupe.find_duplicates(address_book)
+        seconds = time.perf_counter() - start
+        print("{:>8} {:>10} {:>10} {:>10} {:10.3f}".format(
+            len(address_book.book), injected, len(pairs), len(duplicates),
+            seconds))
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : bench_intern.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+""" Compares the memory held by an address book loaded from tact.csv with
+and without the deduplication of mailing addresses, emails and phones.
+
+    python3 Benchmarks/bench_intern.py [NB_CONTACTS]
+"""
+
+import sys
+import time
+import shutil
+import logging
+import tempfile
+import tracemalloc
+
+import synthetic
+
+from tact.core import AddressBook
+from tact.core import ContactFactory
+from tact.storage import CsvBackend
+
+
+def measure(load):
+    """ Gets the memory held by the result of load, in bytes, and the time
+    it took, in seconds. """
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = load()
+        seconds = time.perf_counter() - start
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+
+    return size, seconds
+
+
+def load_without_strings(backend):
+    """ Load the CSV file of backend, every row having its own strings. """
+    address_book = AddressBook()
+    for line in backend.iter_rows():
+        address_book.append_contact(ContactFactory.make_contact(line))
+
+    return address_book
+
+
+def main():
+    nb_contacts = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    logging.disable(logging.CRITICAL)
+
+    data_dir = tempfile.mkdtemp()
+    try:
+        backend = CsvBackend(data_dir, journal=False, cache=False)
+        backend.write_snapshot(synthetic.make_address_book(nb_contacts))
+
+        plain_size, plain_time = measure(
+            lambda: load_without_strings(backend))
+        interned_size, interned_time = measure(backend.make_address_book)
+    finally:
+        shutil.rmtree(data_dir)
+
+    print("{} contacts".format(nb_contacts))
+    print("Without deduplication : {:.1f} MiB in {:.3f} s".format(
+        plain_size / 2 ** 20, plain_time))
+    print("With deduplication    : {:.1f} MiB in {:.3f} s".format(
+        interned_size / 2 ** 20, interned_time))
+    saved = plain_size - interned_size
+    print("Saved                 : {:.1f} MiB ({:.0f} bytes/contact)".format(
+        saved / 2 ** 20, saved / nb_contacts))
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF
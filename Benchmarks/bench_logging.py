@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : bench_logging.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+""" Times the loads of a tact.csv having an invalid phone number every
+INVALID_EVERY rows, with Config/logging.conf writing the log file directly or
+through the queue of the background thread, and with or without the repeated
+validation errors rate limited. The streamed load (as used by tact
+export) logs one error per invalid row, the full load a single summary.
+Times are the best of three. Console output is sent to /dev/null, the log
+file to a temporary directory.
+
+    python3 Benchmarks/bench_logging.py [NB_CONTACTS] [INVALID_EVERY]
+"""
+
+import os
+import csv
+import sys
+import time
+import atexit
+import shutil
+import logging
+import logging.config
+import tempfile
+import contextlib
+
+import synthetic
+
+from tact import util
+from tact import core
+from tact.storage import CsvBackend
+
+# Log file written through the queue, repeated errors rate limited
+MODES = [(False, False), (False, True), (True, False), (True, True)]
+
+
+def write_rows(data_file, nb_contacts, invalid_every):
+    """ Write a tact.csv with an invalid phone number every invalid_every
+    rows. """
+    with open(data_file, 'w', newline='') as output:
+        writer = csv.writer(output, delimiter=';', quoting=csv.QUOTE_ALL)
+        writer.writerow(CsvBackend.DATA_HEADER)
+        for i, row in enumerate(synthetic.make_rows(nb_contacts)):
+            if i % invalid_every == 0:
+                row[4] = "|".join(filter(None, [row[4], str(i)]))
+            writer.writerow(row)
+
+
+def time_load(backend, queued, rate_limited):
+    """ Gets the times of the streamed and of the full load of backend, and
+    of the writing of the records left in the queue. """
+    logging.config.fileConfig(os.path.join('Config', 'logging.conf'))
+    listeners = util.queue_file_handlers() if queued else []
+    rate_limit = core.CHECK_LOG.filters[0]
+    if not rate_limited:
+        core.CHECK_LOG.removeFilter(rate_limit)
+
+    try:
+        start = time.perf_counter()
+        for _ in backend.iter_contacts():
+            pass
+        streamed = time.perf_counter() - start
+        start = time.perf_counter()
+        backend.make_address_book()
+        full = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for listener in listeners:
+            listener.stop()
+            atexit.unregister(listener.stop)
+        flush = time.perf_counter() - start
+    finally:
+        core.CHECK_LOG.filters[:] = [rate_limit]
+
+    return streamed, full, flush
+
+
+def main():
+    nb_contacts = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    invalid_every = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    data_dir = tempfile.mkdtemp()
+    os.environ['TACT_HOME'] = data_dir
+    os.mkdir(os.path.join(data_dir, 'logs'))
+    try:
+        backend = CsvBackend(data_dir, journal=False, cache=False)
+        write_rows(backend.data_file, nb_contacts, invalid_every)
+
+        timings = {}
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(devnull):
+            for mode in MODES:
+                # Best of three
+                timings[mode] = [
+                    min(values) for values in zip(*(
+                        time_load(backend, *mode) for _ in range(3)))]
+        logging.shutdown()
+    finally:
+        shutil.rmtree(data_dir)
+
+    print("{} contacts, {} invalid rows".format(
+        nb_contacts, (nb_contacts + invalid_every - 1) // invalid_every))
+    print("{:20} : {:>8} {:>8} {:>8}".format(
+        "Logging", "Streamed", "Full", "Flush"))
+    for mode in MODES:
+        queued, rate_limited = mode
+        print("{:20} : {:7.3f}s {:7.3f}s {:7.3f}s".format(
+            "{}{}".format(
+                "queued" if queued else "direct",
+                ", rate limited" if rate_limited else ""),
+            *timings[mode]))
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : bench_shards.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+""" Times the load of a synthetic address book (see synthetic.py), then the
+save of a single changed contact, stored in a single CSV file without journal
+and in growing numbers of shards. Shards are loaded by WORKERS processes (0
+for one per CPU, 1 to load them one after the other): on a single CPU, the
+processes only add the cost of sending the contacts back. Loads are timed
+with and without the binary caches. Times are the best of three.
+
+    python3 Benchmarks/bench_shards.py [NB_CONTACTS] [SHARD_COUNTS] [WORKERS]
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import tempfile
+
+import synthetic
+
+from tact.storage import CsvBackend
+from tact.shardstore import ShardedBackend
+
+
+def time_backend(backend, address_book):
+    """ Gets the times of the loads of backend, from its caches then from
+    its CSV files, and of the save of one change. """
+    load = min(timeit(backend.make_address_book) for _ in range(3))
+
+    def load_csv():
+        backend.cache = False
+        try:
+            backend.make_address_book()
+        finally:
+            backend.cache = True
+    parse = min(timeit(load_csv) for _ in range(3))
+
+    contact = next(iter(address_book.book.values()))
+    saves = []
+    for i in range(3):
+        address_book.add_contact_phone(
+            contact.firstname, contact.lastname, "01234567{:02d}".format(i))
+        saves.append(timeit(lambda: backend.update(address_book)))
+        address_book.mark_clean()
+
+    return load, parse, min(saves)
+
+
+def timeit(function):
+    """ Gets the time of a call of function. """
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main():
+    nb_contacts = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    shard_counts = sys.argv[2] if len(sys.argv) > 2 else '4,16,64'
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    logging.disable(logging.CRITICAL)
+
+    address_book = synthetic.make_address_book(nb_contacts)
+    data_dir = tempfile.mkdtemp()
+    try:
+        backends = [('1 (csv)', CsvBackend(
+            os.path.join(data_dir, 'csv'), journal=False))]
+        for nb_shards in [int(count) for count in shard_counts.split(',')]:
+            backends.append((str(nb_shards), ShardedBackend(
+                os.path.join(data_dir, str(nb_shards)), nb_shards, workers)))
+
+        print("{} contacts, {} workers".format(
+            nb_contacts, workers or os.cpu_count()))
+        print("{:>10} : {:>8} {:>8} {:>8}".format(
+            "Shards", "Load", "Parse", "Save"))
+        for name, backend in backends:
+            backend.write(address_book.book.values())
+            print("{:>10} : {:7.3f}s {:7.3f}s {:7.3f}s".format(
+                name, *time_backend(backend, address_book)))
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF
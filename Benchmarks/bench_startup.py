@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : bench_startup.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+""" Cold start of the command line: runs tact --version and tact find in
+fresh interpreters, RUNS times each, and reports their median wall time
+beyond the one of a bare interpreter, then the slowest imports of tact find
+as reported by python -X importtime. Exits with status 1 when a command
+takes more than BUDGET_MS milliseconds beyond the bare interpreter.
+
+The bytecode is written to a temporary cache, as an installed tact would
+have it, so that the first run compiles the sources and the timed runs do
+not.
+
+    python3 Benchmarks/bench_startup.py [RUNS] [BUDGET_MS] [NB_IMPORTS]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import statistics
+import subprocess
+
+# Sources of Tact, and configuration of the working directory
+SOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'Sources')
+CONFIG = os.path.abspath('Config')
+
+# Command lines timed, the first one being the bare interpreter
+COMMANDS = [
+    ('python', ['-c', 'pass']),
+    ('tact --version', ['-c', 'import tact; tact.main()', '--version']),
+    ('tact find', ['-c', 'import tact; tact.main()', 'find', 'Albert',
+                   'Camus']),
+]
+
+
+def run(arguments, work_dir, env):
+    """ Run the interpreter with arguments. Gets its wall time. """
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable] + arguments, cwd=work_dir, env=env, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    return time.perf_counter() - start
+
+
+def slowest_imports(arguments, work_dir, env, count):
+    """ Gets the count imports with the largest cumulative time, in
+    microseconds, as (cumulative, name) pairs. """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + arguments, cwd=work_dir,
+        env=env, check=True, stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE, universal_newlines=True)
+
+    imports = []
+    for line in process.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            imports.append((int(fields[1]), fields[2].strip()))
+
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 100.0
+    nb_imports = int(sys.argv[3]) if len(sys.argv) > 3 else 15
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        shutil.copytree(CONFIG, os.path.join(work_dir, 'Config'))
+        env = dict(os.environ, PYTHONPATH=SOURCES,
+                   PYTHONPYCACHEPREFIX=os.path.join(work_dir, 'pycache'))
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+        # Address book searched by tact find, and bytecode written
+        run(['-c', 'import tact; tact.main()', 'add', 'Albert', 'Camus',
+             '-p', '0123456789'], work_dir, env)
+
+        timings = {}
+        for name, arguments in COMMANDS:
+            run(arguments, work_dir, env)
+            timings[name] = statistics.median(
+                run(arguments, work_dir, env) for _ in range(runs))
+        imports = slowest_imports(COMMANDS[-1][1], work_dir, env, nb_imports)
+    finally:
+        shutil.rmtree(work_dir)
+
+    bare = timings[COMMANDS[0][0]]
+    over_budget = []
+    print("Median of {} runs, budget {:.0f} ms beyond python".format(
+        runs, budget))
+    for name, _ in COMMANDS:
+        extra = (timings[name] - bare) * 1000
+        print("{:15} : {:6.1f} ms ({:+.1f} ms)".format(
+            name, timings[name] * 1000, extra))
+        if name != COMMANDS[0][0] and extra > budget:
+            over_budget.append(name)
+
+    print("Slowest imports of tact find (cumulative):")
+    for cumulative, name in imports:
+        print("{:>8.1f} ms  {}".format(cumulative / 1000, name))
+
+    if over_budget:
+        print("Over budget: {}".format(", ".join(over_budget)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF
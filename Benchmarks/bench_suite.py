@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : bench_suite.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+""" Scaling benchmark of the address book operations on synthetic address
+books (see synthetic.py) of growing sizes, stored by a given backend:
+
+ - write: the whole book written to an empty storage
+ - make_address_book: AddressBookManager.make_address_book
+ - find_contact: AddressBookManager.find_contact, reading the storage
+ - add_contact, remove_contact: AddressBook methods, on the loaded book
+ - save_address_book: AddressBookManager.save_address_book of these changes
+ - export_data: AddressBook.export_data
+
+Each operation gets its best time out of REPEAT passes, each pass starting
+from a fresh copy of the storage, then its peak of memory allocated, as
+traced by tracemalloc in one more pass. Results can be written to a JSON
+file, and compared with the ones of a previous run: the operations slower
+or larger than the baseline by more than the tolerance are reported, and
+the exit status is 1.
+
+    python3 Benchmarks/bench_suite.py --output baseline.json
+    python3 Benchmarks/bench_suite.py --baseline baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+import synthetic
+
+from tact.core import AddressBookManager
+
+# Changes, and reads of the storage, timed by pass
+NB_CHANGES = 1000
+NB_FINDS = 5
+
+OPERATIONS = [
+    'write', 'make_address_book', 'find_contact', 'add_contact',
+    'remove_contact', 'save_address_book', 'export_data']
+
+
+def run_pass(nb_contacts, names, new_rows, trace=False):
+    """ Run the operations once on the storage of AddressBookManager. Gets
+    their times in seconds, and their peaks of memory in bytes when trace
+    is set. """
+    seconds = {}
+    peaks = {}
+    state = {}
+
+    def measure(operation, function):
+        if trace:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        function()
+        seconds[operation] = time.perf_counter() - start
+        if trace:
+            peaks[operation] = tracemalloc.get_traced_memory()[1] - before
+
+    def load():
+        state['book'] = AddressBookManager.make_address_book()
+
+    def find():
+        step = max(1, nb_contacts // NB_FINDS)
+        for firstname, lastname in names[::step][:NB_FINDS]:
+            AddressBookManager.find_contact(firstname, lastname)
+
+    def add():
+        for row in new_rows:
+            state['book'].add_contact(
+                row[0], row[1], row[2],
+                row[3].split('|') if row[3] else [],
+                row[4].split('|') if row[4] else [])
+
+    def remove():
+        for firstname, lastname in names[:NB_CHANGES]:
+            state['book'].remove_contact(firstname, lastname)
+
+    def save():
+        state['book'] = AddressBookManager.save_address_book(state['book'])
+
+    def export():
+        state['book'].export_data()
+
+    measure('make_address_book', load)
+    measure('find_contact', find)
+    measure('add_contact', add)
+    measure('remove_contact', remove)
+    measure('save_address_book', save)
+    measure('export_data', export)
+
+    return seconds, peaks
+
+
+def bench_size(nb_contacts, backend_name, repeat):
+    """ Gets the results of every operation on a book of nb_contacts. """
+    address_book = synthetic.make_address_book(nb_contacts)
+    names = list(address_book.book)
+    new_rows = list(synthetic.make_rows(
+        min(NB_CHANGES, nb_contacts), seed=1, start=nb_contacts))
+
+    work_dir = tempfile.mkdtemp()
+    pristine_dir = os.path.join(work_dir, 'pristine')
+    data_dir = os.path.join(work_dir, 'data')
+    AddressBookManager.DATA_DIR = pristine_dir
+    AddressBookManager.BACKEND = backend_name
+    try:
+        backend = AddressBookManager.get_backend()
+        os.mkdir(pristine_dir)
+        tracemalloc.start()
+        start = time.perf_counter()
+        backend.write(address_book.book.values())
+        write_seconds = time.perf_counter() - start
+        write_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del address_book, backend
+
+        AddressBookManager.DATA_DIR = data_dir
+        timings = []
+        for _ in range(repeat):
+            shutil.copytree(pristine_dir, data_dir)
+            timings.append(run_pass(nb_contacts, names, new_rows)[0])
+            shutil.rmtree(data_dir)
+
+        shutil.copytree(pristine_dir, data_dir)
+        tracemalloc.start()
+        try:
+            peaks = run_pass(nb_contacts, names, new_rows, trace=True)[1]
+        finally:
+            tracemalloc.stop()
+    finally:
+        shutil.rmtree(work_dir)
+
+    results = {'write': {'seconds': write_seconds, 'peak_bytes': write_peak}}
+    for operation in OPERATIONS[1:]:
+        results[operation] = {
+            'seconds': min(timing[operation] for timing in timings),
+            'peak_bytes': peaks[operation],
+        }
+
+    return results
+
+
+def compare(results, baseline, tolerance, min_seconds):
+    """ Gets the descriptions of the results worse than the baseline by more
+    than tolerance. Differences of time below min_seconds are noise. """
+    regressions = []
+    for size, operations in sorted(results.items(), key=lambda x: int(x[0])):
+        for operation, result in operations.items():
+            reference = baseline.get(size, {}).get(operation)
+            if reference is None:
+                continue
+
+            slower = result['seconds'] - reference['seconds']
+            if (slower > min_seconds
+                    and result['seconds'] > reference['seconds'] * (
+                        1 + tolerance)):
+                regressions.append(
+                    "{} at {} contacts: {:.4f} s instead of {:.4f} s".format(
+                        operation, size, result['seconds'],
+                        reference['seconds']))
+            if result['peak_bytes'] > reference['peak_bytes'] * (
+                    1 + tolerance) + 2 ** 16:
+                regressions.append(
+                    "{} at {} contacts: {:.1f} MiB instead of {:.1f} "
+                    "MiB".format(
+                        operation, size, result['peak_bytes'] / 2 ** 20,
+                        reference['peak_bytes'] / 2 ** 20))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the address book operations at growing sizes.")
+    parser.add_argument(
+        '--sizes', default='1000,10000,100000,1000000',
+        help="Numbers of contacts, comma separated")
+    parser.add_argument(
+        '--backend', default='csv', choices=AddressBookManager.BACKENDS)
+    parser.add_argument(
+        '--repeat', type=int, default=3, help="Timed passes by size")
+    parser.add_argument('--output', help="JSON file to write results to")
+    parser.add_argument('--baseline', help="JSON file of previous results")
+    parser.add_argument(
+        '--tolerance', type=float, default=0.25,
+        help="Ratio of time or memory over the baseline to report")
+    parser.add_argument(
+        '--min-seconds', type=float, default=0.005,
+        help="Differences of time ignored as noise")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    results = {}
+    print("{:>8} {:18} {:>10} {:>10}".format(
+        "Contacts", "Operation", "Time (s)", "Peak (MiB)"))
+    for size in [int(size) for size in args.sizes.split(',')]:
+        results[str(size)] = bench_size(size, args.backend, args.repeat)
+        for operation in OPERATIONS:
+            result = results[str(size)][operation]
+            print("{:>8} {:18} {:10.4f} {:10.1f}".format(
+                size, operation, result['seconds'],
+                result['peak_bytes'] / 2 ** 20))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump({
+                'backend': args.backend,
+                'python': platform.python_version(),
+                'changes': NB_CHANGES,
+                'finds': NB_FINDS,
+                'results': results,
+            }, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline:
+            regressions = compare(
+                results, json.load(baseline)['results'], args.tolerance,
+                args.min_seconds)
+        for regression in regressions:
+            print("Regression: {}".format(regression))
+        if regressions:
+            sys.exit(1)
+        print("No regression against {}.".format(args.baseline))
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : synthetic.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import os
+import sys
+import random
+
+# Add sources of Tact in path
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Sources'))
+
+from tact.core import AddressBook
+from tact.core import Contact
+
+
+FIRSTNAMES = [
+    'Albert', 'Marie', 'Jean', 'Pierre', 'Nicolas', 'Sophie', 'Camille',
+    'Louis', 'Emma', 'Hugo', 'Chloe', 'Lucas', 'Lea', 'Gabriel', 'Manon',
+    'Arthur', 'Jade', 'Jules', 'Louise', 'Adam', 'Alice', 'Paul', 'Lina',
+    'Raphael', 'Rose', 'Nathan', 'Anna', 'Victor', 'Julia', 'Ethan']
+
+LASTNAMES = [
+    'Martin', 'Bernard', 'Thomas', 'Petit', 'Robert', 'Richard', 'Durand',
+    'Dubois', 'Moreau', 'Laurent', 'Simon', 'Michel', 'Lefebvre', 'Leroy',
+    'Roux', 'David', 'Bertrand', 'Morel', 'Fournier', 'Girard', 'Bonnet',
+    'Dupont', 'Lambert', 'Fontaine', 'Rousseau', 'Vincent', 'Muller',
+    'Lefevre', 'Faure', 'Andre', 'Mercier', 'Blanc', 'Guerin', 'Boyer']
+
+STREETS = [
+    'rue de la Paix', 'avenue des Champs', 'boulevard Voltaire',
+    'rue de Troy', 'place de la Gare', 'rue Victor Hugo', 'quai Saint Michel']
+
+CITIES = [
+    '75001 Paris', '69002 Lyon', '13001 Marseille', '31000 Toulouse',
+    '67000 Strasbourg', '33000 Bordeaux', '59000 Lille', '44000 Nantes']
+
+DOMAINS = ['abase.fr', 'test.fr', 'mail.com', 'societe.fr', 'exemple.org']
+
+SEPARATORS = ['', ' ', '.', '-']
+
+
+# -----------------------------------------------------------------------------
+#
+# Module methods
+#
+# -----------------------------------------------------------------------------
+def make_rows(nb_contacts, seed=0, start=0):
+    """ Yield nb_contacts deterministic raw rows, as stored in tact.csv.
+    Names are unique, phones match ContactChecker.PHONE_RE and emails match
+    ContactChecker.EMAIL_RE. Rows numbered from start have names distinct
+    from the ones of the rows before it. """
+    rand = random.Random(seed)
+    for i in range(start, start + nb_contacts):
+        firstname = rand.choice(FIRSTNAMES)
+        # The row number keeps (firstname, lastname) unique
+        lastname = "{}{}".format(rand.choice(LASTNAMES), i)
+        mailing_address = "{} {}, {}".format(
+            rand.randint(1, 150), rand.choice(STREETS), rand.choice(CITIES))
+
+        emails = []
+        for _ in range(rand.randint(0, 2)):
+            # EMAIL_RE does not allow 0 in the local part
+            emails.append("{}{}@{}".format(
+                firstname.lower(),
+                "".join(rand.choice("123456789") for _ in range(3)),
+                rand.choice(DOMAINS)))
+
+        phones = []
+        for _ in range(rand.randint(0, 3)):
+            separator = rand.choice(SEPARATORS)
+            phones.append("0{}{}".format(
+                rand.randint(1, 9),
+                "".join(
+                    "{}{:02d}".format(separator, rand.randint(0, 99))
+                    for _ in range(4))))
+
+        yield [
+            firstname, lastname, mailing_address,
+            "|".join(emails), "|".join(phones)]
+
+
+def make_address_book(nb_contacts, seed=0):
+    """ Build an AddressBook of nb_contacts synthetic contacts. """
+    address_book = AddressBook()
+    for row in make_rows(nb_contacts, seed):
+        address_book.append_contact(Contact(
+            row[0], row[1], row[2],
+            row[3].split('|') if row[3] else [],
+            row[4].split('|') if row[4] else [],
+            check=False))
+
+    return address_book
+
+
+# EOF
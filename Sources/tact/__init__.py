@@ -8,9 +8,8 @@ __license__ = 'Proprietary License'
 __copyright__ = 'Copyright 2014 Abase Europe'
 
 
-from tact import cli
-
-
 def main():
     """Entry point for the application script"""
+    # Imported here so that importing tact stays cheap
+    from tact import cli
     cli.run()
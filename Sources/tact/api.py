@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : api.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import json
+import signal
+import asyncio
+import logging
+import itertools
+
+from http import HTTPStatus
+from urllib.parse import parse_qs
+from urllib.parse import unquote
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from tact import export
+from tact.core import AddressBookManager
+from tact.core import ContactChecker
+
+# Logger
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+#
+# Module methods
+#
+# -----------------------------------------------------------------------------
+def serve(host, port):
+    """ Run an API server until it gets SIGINT or SIGTERM. """
+    server = ApiServer(AddressBookManager.make_address_book())
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(server.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.save()
+        LOG.info("tact API server stopped.")
+
+
+# -----------------------------------------------------------------------------
+#
+# ApiServer class
+#
+# -----------------------------------------------------------------------------
+class ApiServer:
+
+    """ Serve an address book held in memory as JSON over HTTP/1.1:
+
+     - GET /contacts/FIRSTNAME/LASTNAME
+     - GET /contacts?prefix=PREFIX[&field=firstname|lastname]
+     - GET /contacts?phone=PHONE or /contacts?email=EMAIL
+     - POST /contacts, with the contact as exported in JSON Lines
+     - DELETE /contacts/FIRSTNAME/LASTNAME
+     - POST /contacts/FIRSTNAME/LASTNAME/phones, with {"phone": PHONE}
+     - DELETE /contacts/FIRSTNAME/LASTNAME/phones/PHONE
+     - and the same for emails, with {"email": EMAIL}
+
+    Reads are answered right away by the connection handlers. Writes are
+    queued to a single writer task, which applies all the queued writes,
+    saves them at once in a worker thread, then answers them. """
+
+    def __init__(self, address_book):
+        """ Initialisation """
+        self.address_book = address_book
+        self.writes = None
+        self.writer_task = None
+        # A single thread, so that saves never overlap
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def start(self, host, port):
+        """ Start listening and the writer task. Gets the asyncio server. """
+        self.writes = asyncio.Queue()
+        server = await asyncio.start_server(self.handle, host, port)
+        self.writer_task = asyncio.get_running_loop().create_task(
+            self.write_loop())
+        LOG.info("tact API server listening on http://%s:%s/.",
+                 host, server.sockets[0].getsockname()[1])
+        return server
+
+    async def serve_forever(self, host, port):
+        """ Serve until cancelled. """
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        """ Answer the requests of a connection, kept alive between them. """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode(
+                    'latin-1').split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(
+                    int(headers.get('content-length', 0)))
+
+                status, payload = await self.dispatch(method, target, body)
+                data = json.dumps(payload).encode('utf-8')
+                keep_alive = (
+                    version == 'HTTP/1.1'
+                    and headers.get('connection', '').lower() != 'close')
+                writer.write(
+                    "HTTP/1.1 {} {}\r\n"
+                    "Content-Type: application/json\r\n"
+                    "Content-Length: {}\r\n"
+                    "Connection: {}\r\n\r\n".format(
+                        status, HTTPStatus(status).phrase, len(data),
+                        "keep-alive" if keep_alive else "close").encode(
+                            'latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, body):
+        """ Gets the status and the JSON payload answering a request. """
+        url = urlsplit(target)
+        path = [unquote(part) for part in url.path.strip('/').split('/')]
+        if path[0] != 'contacts' or len(path) not in (1, 3, 4, 5):
+            return 404, {'error': "Unknown resource."}
+
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {'error': "The body is not JSON."}
+
+        if method == 'GET' and len(path) == 1:
+            return self.search(parse_qs(url.query))
+        if method == 'GET' and len(path) == 3:
+            contact = self.address_book.find_contact(path[1], path[2])
+            if contact is None:
+                return 404, {'error': "Unknown contact."}
+            return 200, export.as_dict(contact)
+
+        if method == 'POST' and len(path) == 1:
+            return await self.write(self.add_contact, data)
+        if method == 'DELETE' and len(path) == 3:
+            return await self.write(self.remove_contact, *path[1:])
+        if method == 'POST' and len(path) == 4:
+            return await self.write(self.add_detail, *path[1:], data)
+        if method == 'DELETE' and len(path) == 5:
+            return await self.write(self.remove_detail, *path[1:])
+
+        return 405, {'error': "Method not allowed."}
+
+    def search(self, query):
+        """ Find the contacts by name prefix, phone number or email. """
+        if 'prefix' in query:
+            field = query.get('field', ['lastname'])[0]
+            if field not in ('firstname', 'lastname'):
+                return 400, {'error': "Unknown field {}.".format(field)}
+            contacts = self.address_book.search_prefix(
+                query['prefix'][0], field)
+        elif 'phone' in query:
+            contacts = self.address_book.find_by_phone(query['phone'][0])
+        elif 'email' in query:
+            contacts = self.address_book.find_by_email(query['email'][0])
+        else:
+            return 400, {'error': "Give a prefix, a phone or an email."}
+
+        return 200, [export.as_dict(contact) for contact in contacts]
+
+    async def write(self, operation, *args):
+        """ Queue a write to the writer task. Gets its answer, once saved. """
+        answer = asyncio.get_running_loop().create_future()
+        await self.writes.put((operation, args, answer))
+        return await answer
+
+    async def write_loop(self):
+        """ Apply the queued writes one at a time, then save them together
+        off the event loop and answer them. """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.writes.get()]
+            while not self.writes.empty():
+                batch.append(self.writes.get_nowait())
+
+            results = []
+            for operation, args, answer in batch:
+                try:
+                    results.append(operation(*args))
+                except Exception as error:
+                    LOG.exception(error)
+                    results.append((500, {'error': str(error)}))
+
+            # Readers go on meanwhile, writes wait for the save
+            try:
+                await loop.run_in_executor(self.executor, self.save)
+            except Exception as error:
+                LOG.exception(error)
+                # Otherwise the next save would write the changes refused
+                try:
+                    await loop.run_in_executor(self.executor, self.rollback)
+                except Exception as error:
+                    LOG.exception(error)
+                results = [
+                    (500, {'error': "The changes could not be saved."})
+                    for _ in batch]
+
+            for (operation, args, answer), result in zip(batch, results):
+                if not answer.cancelled():
+                    answer.set_result(result)
+
+    def save(self):
+        """ Save the changes of the address book, if any. """
+        self.address_book = AddressBookManager.save_address_book(
+            self.address_book)
+
+    def rollback(self):
+        """ Drop the changes which could not be saved, loading the address
+        book from the storage again. """
+        self.address_book = AddressBookManager.make_address_book()
+
+    def add_contact(self, data):
+        """ Add the contact described by data. """
+        if not isinstance(data, dict):
+            return 400, {'error': "The contact must be a JSON object."}
+        firstname = data.get('firstname')
+        lastname = data.get('lastname')
+        mailing_address = data.get('mailing_address') or ""
+        emails = data.get('emails') or []
+        phones = data.get('phones') or []
+        if not firstname or not lastname:
+            return 400, {'error': "A contact needs a firstname and a "
+                                  "lastname."}
+        # JSON values may be of any type, while the storages hold strings
+        if (not isinstance(emails, list) or not isinstance(phones, list)
+                or not all(isinstance(value, str) for value in
+                           itertools.chain(
+                               (firstname, lastname, mailing_address),
+                               emails, phones))):
+            return 400, {'error': "Names and mailing address must be "
+                                  "strings, emails and phones lists of "
+                                  "strings."}
+        if not all(map(ContactChecker.is_phone, phones)) or not all(
+                map(ContactChecker.is_email, emails)):
+            return 400, {'error': "Malformed phone number or email."}
+        if self.address_book.find_contact(firstname, lastname) is not None:
+            return 409, {'error': "The contact already exists."}
+
+        self.address_book.add_contact(
+            firstname, lastname, mailing_address, emails, phones)
+        return 201, export.as_dict(
+            self.address_book.find_contact(firstname, lastname))
+
+    def remove_contact(self, firstname, lastname):
+        """ Remove a contact. """
+        if self.address_book.find_contact(firstname, lastname) is None:
+            return 404, {'error': "Unknown contact."}
+
+        self.address_book.remove_contact(firstname, lastname)
+        return 200, {}
+
+    def add_detail(self, firstname, lastname, details, data):
+        """ Add the phone number or the email address in data to a contact,
+        according to details (phones or emails). """
+        contact = self.address_book.find_contact(firstname, lastname)
+        if contact is None:
+            return 404, {'error': "Unknown contact."}
+
+        if details == 'phones':
+            phone = data.get('phone') if isinstance(data, dict) else None
+            if not isinstance(phone, str) or not ContactChecker.is_phone(
+                    phone):
+                return 400, {'error': "Malformed phone number."}
+            contact.add_phone(phone)
+        elif details == 'emails':
+            email = data.get('email') if isinstance(data, dict) else None
+            if not isinstance(email, str) or not ContactChecker.is_email(
+                    email):
+                return 400, {'error': "Malformed email address."}
+            contact.add_email(email)
+        else:
+            return 404, {'error': "Unknown resource."}
+
+        return 201, export.as_dict(contact)
+
+    def remove_detail(self, firstname, lastname, details, value):
+        """ Remove a phone number or an email address (details) from a
+        contact. """
+        contact = self.address_book.find_contact(firstname, lastname)
+        if contact is None:
+            return 404, {'error': "Unknown contact."}
+
+        if details == 'phones' and value in contact.phones:
+            contact.remove_phone(value)
+        elif details == 'emails' and value in contact.emails:
+            contact.remove_email(value)
+        else:
+            return 404, {'error': "Unknown {}.".format(details[:-1])}
+
+        return 200, export.as_dict(contact)
+
+
+# EOF
@@ -11,10 +11,14 @@
 
 import sys
 import os
+import logging
 import argparse
 
 from tact import util
+from tact import stats
+from tact import __version__
 from tact.core import AddressBookManager
+from tact.core import AddressBookError
 
 
 # Gets execution directory
@@ -23,17 +27,30 @@ exe_dir = util.get_exe_dir()
 # Sets environment variable for the application
 os.environ['TACT_HOME'] = exe_dir
 
-# Gets a logger
-LOG = util.init_logging()
+# Gets a logger, configured by run() once the command line is parsed
+LOG = logging.getLogger('tact')
+
+# Commands able to run against an address book already held in memory
+BOOK_COMMANDS = [
+    'add', 'remove', 'add-phone', 'remove-phone', 'add-email',
+    'remove-email', 'find', 'search', 'lookup', 'import', 'dedupe']
 
 
 def execute(task_to_execute):
-    """ Execute decorator. """
+    """ Execute decorator. The address book is loaded before the task and
+    saved after it, unless it is already held in memory by the caller (see
+    the daemon). """
     def wrapped(args):
-        book = AddressBookManager.make_address_book()
+        if getattr(args, 'book', None) is not None:
+            task_to_execute(args)
+            return
+
+        with stats.timed('load'):
+            book = AddressBookManager.make_address_book()
         args.book = book
         task_to_execute(args)
-        AddressBookManager.save_address_book(book)
+        with stats.timed('save'):
+            AddressBookManager.save_address_book(book)
     return wrapped
 
 
@@ -45,13 +62,51 @@ def execute_add(args):
         args.mailing_address, args.emails, args.phones)
 
 
-@execute
 def execute_find(args):
-    contact = args.book.find_contact(args.firstname, args.lastname)
+    """ Executes FIND action by streaming the address book file, or a typo
+    tolerant search with --fuzzy. """
+    if args.fuzzy or getattr(args, 'book', None) is not None:
+        execute_find_in_book(args)
+        return
+
+    contact = AddressBookManager.find_contact(args.firstname, args.lastname)
     if contact:
         print(contact)
 
 
+@execute
+def execute_find_in_book(args):
+    """ Executes FIND action on the whole address book, with --fuzzy or when
+    the book is already held in memory. """
+    if args.fuzzy:
+        contacts = args.book.search_fuzzy(
+            args.firstname, args.lastname, args.top)
+    else:
+        contact = args.book.find_contact(args.firstname, args.lastname)
+        contacts = [contact] if contact else []
+    for contact in contacts:
+        print(contact)
+
+
+@execute
+def execute_search(args):
+    """ Executes SEARCH action: finds the contacts whose name starts with the
+    given prefix. """
+    for contact in args.book.search_prefix(args.prefix, args.field):
+        print(contact)
+
+
+@execute
+def execute_lookup(args):
+    """ Executes LOOKUP action: finds the owners of a phone or an email. """
+    if args.phone:
+        contacts = args.book.find_by_phone(args.phone)
+    else:
+        contacts = args.book.find_by_email(args.email)
+    for contact in contacts:
+        print(contact)
+
+
 @execute
 def execute_remove(args):
     args.book.remove_contact(args.firstname, args.lastname)
@@ -83,8 +138,112 @@ def execute_remove_email(args):
     args.book.remove_contact_email(args.firstname, args.lastname, args.email)
 
 
-def run():
-    """ Main command-line execution loop. """
+@execute
+def execute_import(args):
+    """ Executes IMPORT action: imports the contacts of a CSV or JSON Lines
+    file at once. """
+    from tact import importer
+
+    report = importer.import_file(
+        args.book, args.file, args.format, args.jobs)
+    print(
+        "{imported} contacts imported from {rows} rows in {seconds:.2f} s "
+        "({rows_per_second:.0f} rows/s), {rejected} rejected rows, "
+        "{duplicates} duplicates.".format(**report))
+
+
+@execute
+def execute_dedupe(args):
+    """ Executes DEDUPE action: reports the contacts which look like the
+    same person, and merges them with --merge. """
+    from tact import dedupe
+
+    duplicates, groups = dedupe.dedupe(
+        args.book, args.threshold, apply=args.merge)
+    for total, first, second, reasons in duplicates:
+        print("{:.2f}  {} {}  <->  {} {}  ({})".format(
+            total, first.firstname, first.lastname, second.firstname,
+            second.lastname, ", ".join(reasons)))
+    print("{} pairs of duplicates in {} groups{}.".format(
+        len(duplicates), len(groups),
+        ", merged" if args.merge else " (dry run, --merge to merge them)"))
+
+
+def execute_export(args):
+    """ Executes EXPORT action: streams the contacts to a CSV, JSON Lines or
+    vCard file, without loading the whole address book. """
+    from tact import export
+
+    export.export_file(
+        AddressBookManager.iter_contacts(), args.format, args.output)
+
+
+@execute
+def execute_batch(args):
+    """ Executes BATCH action: runs the commands of a file, one per line, on
+    the address book loaded once. The book is saved once at the end, and
+    not at all if a command fails. """
+    import shlex
+
+    parser = build_parser()
+    if args.file == '-':
+        lines = sys.stdin.readlines()
+    else:
+        with open(args.file, encoding='utf-8') as commands:
+            lines = commands.readlines()
+
+    for line_number, line in enumerate(lines, 1):
+        argv = shlex.split(line, comments=True)
+        if not argv:
+            continue
+
+        try:
+            command_args = parser.parse_args(argv)
+        except SystemExit:
+            # argparse has already printed the error
+            command_args = None
+        if command_args is None or command_args.command not in BOOK_COMMANDS:
+            raise AddressBookError(
+                "Line {} of {} is not a valid command, nothing has been "
+                "saved: {}".format(line_number, args.file, line.strip()))
+
+        command_args.book = args.book
+        command_args.func(command_args)
+
+
+def execute_compact(args):
+    """ Executes COMPACT action: folds the journal into the CSV file. """
+    AddressBookManager.compact()
+
+
+def execute_convert(args):
+    """ Executes CONVERT action: converts the address book to a backend. """
+    AddressBookManager.convert(args.target, args.origin)
+
+
+def execute_reshard(args):
+    """ Executes RESHARD action: splits the address book into shards. """
+    AddressBookManager.reshard(args.shards, args.origin)
+
+
+def execute_serve(args):
+    """ Executes SERVE action: runs the daemon holding the address book in
+    memory until it is interrupted. """
+    from tact import daemon
+
+    return daemon.serve(build_parser())
+
+
+def execute_http(args):
+    """ Executes HTTP action: serves the address book as a JSON API until it
+    is interrupted. """
+    from tact import api
+
+    api.serve(args.host, args.port)
+
+
+def build_parser():
+    """ Build the parser of the command line, with a subparser per action. """
     # Create the arguments parser
     parser = argparse.ArgumentParser(
         description=(
@@ -93,14 +252,27 @@ def run():
         ),
         prog='tact')
 
-    tact_version = '%(prog)s ' + util.find_version()
+    tact_version = '%(prog)s ' + __version__
 
     parser.add_argument(
         '--version', action='version',
         version=tact_version)
 
+    # Instrumentation of the command
+    parser.add_argument(
+        '--timings', action='store_true',
+        help='Print the time spent in each phase of the command and the '
+             'work done (rows parsed, validations, bytes written) to '
+             'standard error.')
+
+    parser.add_argument(
+        '--profile', action='store', metavar='FILE',
+        help='Run the command under cProfile and dump its statistics into '
+             'FILE, to be read with pstats.')
+
     # Create Subparsers for each action command
-    subparsers = parser.add_subparsers(help='Available actions')
+    subparsers = parser.add_subparsers(
+        dest='command', help='Available actions')
 
     # ADD action - Arguments parser
     parser_add = subparsers.add_parser(
@@ -240,20 +412,249 @@ def run():
         'lastname', action='store', metavar='lastname',
         help='Contact lastname.')
 
+    parser_find.add_argument(
+        '--fuzzy', action='store_true',
+        help='Show the closest Contacts, tolerating typos.')
+
+    parser_find.add_argument(
+        '--top', action='store', type=int, metavar='K', default=5,
+        help='Number of Contacts shown with --fuzzy (default: 5).')
+
     parser_find.set_defaults(func=execute_find)
 
-    # Parse the arguments line
-    try:
+    # SEARCH action - Arguments parser
+    parser_search = subparsers.add_parser(
+        'search',
+        help='search Contacts in Address Book by the beginning of their name'
+        )
+
+    parser_search.add_argument(
+        '--prefix', action='store', metavar='PREFIX', required=True,
+        help='Beginning of the name, case and accent insensitive.')
+
+    parser_search.add_argument(
+        '--field', action='store', choices=['lastname', 'firstname'],
+        default='lastname',
+        help='Name searched (default: lastname).')
+
+    parser_search.set_defaults(func=execute_search)
+
+    # LOOKUP action - Arguments parser
+    parser_lookup = subparsers.add_parser(
+        'lookup',
+        help='find the Contacts owning a phone number or an email address'
+        )
+
+    lookup_group = parser_lookup.add_mutually_exclusive_group(required=True)
+
+    lookup_group.add_argument(
+        '-p', '--phone', action='store', metavar="PHONE",
+        help='Phone number, whatever its separators.')
+
+    lookup_group.add_argument(
+        '-e', '--email', action='store', metavar="EMAIL",
+        help='Email address, case insensitive.')
+
+    parser_lookup.set_defaults(func=execute_lookup)
+
+    # IMPORT action - Arguments parser
+    parser_import = subparsers.add_parser(
+        'import',
+        help='import Contacts in bulk from a CSV or JSON Lines file'
+        )
+
+    parser_import.add_argument(
+        'file', action='store', metavar='FILE',
+        help='File to import: CSV in the tact.csv layout, or JSON Lines with '
+             'firstname, lastname, mailing_address, emails and phones.')
+
+    parser_import.add_argument(
+        '--format', action='store', choices=['csv', 'jsonl'],
+        help='Format of the file (default: guessed from its extension).')
+
+    parser_import.add_argument(
+        '-j', '--jobs', action='store', type=int, metavar='N',
+        help='Number of validation processes (default: number of CPUs).')
+
+    parser_import.set_defaults(func=execute_import)
+
+    # DEDUPE action - Arguments parser
+    parser_dedupe = subparsers.add_parser(
+        'dedupe',
+        help='find the Contacts which look like the same person, and merge '
+             'them'
+        )
+
+    parser_dedupe.add_argument(
+        '--threshold', action='store', type=float, default=0.8,
+        help='Score, between 0 and 1, from which two Contacts are taken for '
+             'the same person (default: 0.8).')
+
+    parser_dedupe.add_argument(
+        '--merge', action='store_true',
+        help='Merge each group of duplicates into one Contact, with all '
+             'their phones and emails (default: only report them).')
+
+    parser_dedupe.set_defaults(func=execute_dedupe)
+
+    # EXPORT action - Arguments parser
+    parser_export = subparsers.add_parser(
+        'export',
+        help='export Contacts to a CSV, JSON Lines or vCard file'
+        )
+
+    parser_export.add_argument(
+        '--format', action='store', choices=['csv', 'jsonl', 'vcard'],
+        default='csv',
+        help='Format of the exported file (default: csv).')
+
+    parser_export.add_argument(
+        '-o', '--output', action='store', metavar='FILE',
+        help='File to write (default: the standard output).')
+
+    parser_export.set_defaults(func=execute_export)
+
+    # BATCH action - Arguments parser
+    parser_batch = subparsers.add_parser(
+        'batch',
+        help='run the commands of a file, one per line, and save the Address '
+             'Book once'
+        )
+
+    parser_batch.add_argument(
+        'file', action='store', metavar='FILE', nargs='?', default='-',
+        help='File of commands, such as "add-phone Albert Camus 0123456789" '
+             '(default: - for the standard input).')
+
+    parser_batch.set_defaults(func=execute_batch)
+
+    # COMPACT action - Arguments parser
+    parser_compact = subparsers.add_parser(
+        'compact',
+        help='fold the journal of changes into the Address Book file'
+        )
+
+    parser_compact.set_defaults(func=execute_compact)
+
+    # CONVERT action - Arguments parser
+    parser_convert = subparsers.add_parser(
+        'convert',
+        help='convert the Address Book to another storage format'
+        )
+
+    parser_convert.add_argument(
+        '--to', action='store', choices=AddressBookManager.BACKENDS,
+        required=True, dest='target',
+        help='Target storage format.')
+
+    parser_convert.add_argument(
+        '--from', action='store', choices=AddressBookManager.BACKENDS,
+        dest='origin',
+        help='Origin storage format (default: the configured one).')
+
+    parser_convert.set_defaults(func=execute_convert)
+
+    # RESHARD action - Arguments parser
+    parser_reshard = subparsers.add_parser(
+        'reshard',
+        help='split the Address Book into shard files, by lastname'
+        )
+
+    parser_reshard.add_argument(
+        '--shards', action='store', type=int, required=True,
+        help='Number of shards.')
+
+    parser_reshard.add_argument(
+        '--from', action='store', choices=AddressBookManager.BACKENDS,
+        dest='origin',
+        help='Origin storage format (default: the configured one).')
+
+    parser_reshard.set_defaults(func=execute_reshard)
+
+    # SERVE action - Arguments parser
+    parser_serve = subparsers.add_parser(
+        'serve',
+        help='run a daemon holding the Address Book in memory, to which the '
+             'other commands are forwarded'
+        )
+
+    parser_serve.set_defaults(func=execute_serve)
+
+    # HTTP action - Arguments parser
+    parser_http = subparsers.add_parser(
+        'http',
+        help='serve the Address Book as a JSON API over HTTP'
+        )
+
+    parser_http.add_argument(
+        '--host', action='store', default='127.0.0.1',
+        help='Address to listen on (default: 127.0.0.1).')
+
+    parser_http.add_argument(
+        '--port', action='store', type=int, default=8080,
+        help='Port to listen on (default: 8080).')
+
+    parser_http.set_defaults(func=execute_http)
+
+    return parser
+
+
+def dispatch(parser, args):
+    """ Run the command of args, in the daemon when one is running. Gets the
+    exit status of the command, None when it succeeded. """
+    if args.command:
+        # Commands are run by the daemon when one is running
+        from tact import daemon
+        if args.command in daemon.COMMANDS:
+            with stats.timed('forward'):
+                status = daemon.forward(sys.argv[1:])
+            if status is not None:
+                return status
+        elif (args.command in daemon.EXCLUSIVE_COMMANDS
+                and daemon.is_running()):
+            LOG.error(
+                "A tact daemon is running, stop it before the %s "
+                "command.", args.command)
+            return 1
+
+    if hasattr(args, "func"):
+        with stats.timed('execute'):
+            return args.func(args)
+
+    parser.print_help()
+    return None
+
+
+def run():
+    """ Main command-line execution loop. """
+    # Parse the arguments line, --help and --version exit here before the
+    # logging system is configured
+    with stats.timed('parse'):
+        parser = build_parser()
         args = parser.parse_args()
-        if hasattr(args, "func"):
-            args.func(args)
-        else:
-            parser.print_help()
+
+    stats.ENABLED = args.timings
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        with stats.timed('logging'):
+            util.init_logging()
+        status = dispatch(parser, args)
     except Exception as error:
         LOG.exception(error)
         sys.exit(2)
-
-    sys.exit()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if args.timings:
+            stats.report()
+
+    sys.exit(status)
 
 
 # EOF
@@ -10,11 +10,11 @@
 ##
 
 import os
-import csv
 import logging
 import re
 
 from tact import util
+from tact import stats
 
 # Gets execution directory
 exe_dir = util.get_exe_dir()
@@ -22,6 +22,10 @@ exe_dir = util.get_exe_dir()
 # Logger
 LOG = logging.getLogger(__name__)
 
+# Logger of the validation errors, repeated for each invalid row of a file
+CHECK_LOG = logging.getLogger(__name__ + '.checker')
+CHECK_LOG.addFilter(util.RateLimitFilter())
+
 
 # -----------------------------------------------------------------------------
 #
@@ -32,57 +36,87 @@ class AddressBook:
 
     """ Create a address book and add the create contact. """
 
-    def __init__(self):
-        """ Initialisation """
-        self.book = []
+    def __init__(self, source=None):
+        """ Initialisation (source is a store answering lookups of contacts
+        which are not loaded in the book yet) """
+        # Contacts indexed by (firstname, lastname), in insertion order
+        self.book = {}
+        # Store the remaining contacts are fetched from on demand
+        self.source = source
+        # Secondary indexes are built on first use, then kept in sync.
+        # Reverse lookup indexes: canonical value -> {contact key: contact}
+        self.phone_index = None
+        self.email_index = None
+        # Sorted name indexes for prefix searches
+        self.name_indexes = None
+        # Trigram index for fuzzy searches
+        self.trigram_index = None
+        # Changes made since the book was loaded, as journal records
+        self.changes = []
+        # Keys of the contacts created, modified or deleted since loaded
+        self.created = set()
+        self.modified = set()
+        self.deleted = set()
+        # True while changes read from the journal are applied
+        self.replaying = False
+        # Version of the storage the book has been loaded from or saved to
+        self.version = None
+        # Storage the book has been loaded from as a whole, which may keep
+        # a trigram index of its contacts (see load_trigram_index), until
+        # the book is saved
+        self.storage = None
 
     def find_contact(self, firstname, lastname):
         """ Find a contact in AddressBook (if the contact exist) """
-        search_contact = None
-        tmp_contact = Contact(firstname, lastname)
-
-        for contact in self.book:
-            if contact == tmp_contact:
-                search_contact = contact
-                break
+        search_contact = self.book.get((firstname, lastname))
+        if search_contact is None and self.source is not None:
+            search_contact = self._fetch(firstname, lastname)
 
         if not search_contact:
-            LOG.warn(
-                "Contact {} {} doesn't exist.".format(
-                    firstname, lastname))
+            LOG.warning(
+                "Contact %s %s doesn't exist.", firstname, lastname)
 
         return search_contact
 
     def append_contact(self, contact):
-        """ Add a contact directly into AddressBook without any check. """
-        self.book.append(contact)
+        """ Add a contact directly into AddressBook without any check.
+        A contact whose name is already indexed is ignored (e.g. when the
+        whole book is loaded after some contacts have been fetched). """
+        if contact.key not in self.book:
+            self._register(contact)
 
     def add_contact(
             self,
             firstname, lastname,
             mailing_address="", emails=[], phones=[]):
         """ Add a new contact in address book. """
-        if not self.find_contact(firstname, lastname):
+        if (firstname, lastname) not in self.book and (
+                self.source is None
+                or self._fetch(firstname, lastname) is None):
             new_contact = Contact(
                 firstname, lastname,
                 mailing_address, emails, phones)
-            self.book.append(new_contact)
+            self._register(new_contact)
+            self.record(
+                'add_contact', new_contact, *new_contact.export_data()[2:])
             LOG.info(
-                "A new contact has been added in Address Book: {} ".format(
-                    new_contact))
+                "A new contact has been added in Address Book: %s ",
+                new_contact)
         else:
             LOG.info(
-                "Contact {} {} already exists in AddressBook.".format(
-                    firstname, lastname))
+                "Contact %s %s already exists in AddressBook.",
+                firstname, lastname)
 
     def get_nb_contacts(self):
         """ Get the number of contact in the address book. """
+        self.load_all()
         return len(self.book)
 
     def export_data(self):
         """ Export data as a list of lists. """
+        self.load_all()
         data = []
-        for contact in self.book:
+        for contact in self.book.values():
             data.append(contact.export_data())
 
         return data
@@ -90,7 +124,8 @@ class AddressBook:
     def remove_contact(self, firstname, lastname,):
         contact = self.find_contact(firstname, lastname)
         if contact:
-            self.book.remove(contact)
+            self._unregister(contact)
+            self.record('remove_contact', contact)
 
     def add_contact_phone(self, firstname, lastname, phone):
         contact = self.find_contact(firstname, lastname)
@@ -112,8 +147,287 @@ class AddressBook:
         if contact:
             contact.remove_email(email)
 
+    def find_by_phone(self, phone):
+        """ Find the contacts owning a phone number, whatever the separators
+        used to write it. """
+        canonical = ContactChecker.canonical_phone(phone)
+        if self.source is not None and not self.is_dirty():
+            keys = self.source.find_keys_by_phone(canonical)
+            if keys is not None:
+                return self._fetch_all(keys)
+
+        self.load_all()
+        if self.phone_index is None:
+            self._build_reverse_indexes()
+        return list(self.phone_index.get(canonical, {}).values())
+
+    def find_by_email(self, email):
+        """ Find the contacts owning an email address (case insensitive). """
+        canonical = ContactChecker.canonical_email(email)
+        if self.source is not None and not self.is_dirty():
+            keys = self.source.find_keys_by_email(canonical)
+            if keys is not None:
+                return self._fetch_all(keys)
+
+        self.load_all()
+        if self.email_index is None:
+            self._build_reverse_indexes()
+        return list(self.email_index.get(canonical, {}).values())
+
+    def record(self, action, contact, *values):
+        """ Record a change made on contact, to be appended to the journal,
+        and track the contact as created, modified or deleted. """
+        if self.replaying:
+            return
+
+        self.changes.append(
+            [action, contact.firstname, contact.lastname] + list(values))
+
+        key = contact.key
+        if action == 'add_contact':
+            if key in self.deleted:
+                self.deleted.discard(key)
+                self.modified.add(key)
+            else:
+                self.created.add(key)
+        elif action == 'remove_contact':
+            self.modified.discard(key)
+            if key in self.created:
+                self.created.discard(key)
+            else:
+                self.deleted.add(key)
+        elif key not in self.created:
+            self.modified.add(key)
+
+    def is_dirty(self):
+        """ Tell if the book has changed since it was loaded or saved. """
+        return bool(self.changes)
+
+    def mark_clean(self):
+        """ Forget the changes, once they have been saved. """
+        # The storage no longer tells the changes made since it was loaded
+        self.storage = None
+        self.changes = []
+        self.created = set()
+        self.modified = set()
+        self.deleted = set()
+
+    def apply_change(self, change, record=False):
+        """ Replay a change read from the journal, without recording it
+        unless record is set. """
+        action, firstname, lastname = change[:3]
+        values = change[3:]
+        contact = self.book.get((firstname, lastname))
+        if contact is None and self.source is not None:
+            contact = self._fetch(firstname, lastname)
+        self.replaying = not record
+        try:
+            if action == 'add_contact':
+                if not contact:
+                    contact = ContactFactory.make_contact(change[1:])
+                    self.append_contact(contact)
+                    self.record(action, contact, *values)
+            elif not contact:
+                LOG.warning(
+                    "Journal refers to unknown contact %s %s.",
+                    firstname, lastname)
+            elif action == 'remove_contact':
+                self._unregister(contact)
+                self.record(action, contact)
+            elif action == 'add_phone':
+                contact.add_phone(values[0])
+            elif action == 'remove_phone':
+                contact.remove_phone(values[0])
+            elif action == 'add_email':
+                contact.add_email(values[0])
+            elif action == 'remove_email':
+                contact.remove_email(values[0])
+            else:
+                raise AddressBookError(
+                    "Unknown journal action {}.".format(action))
+        finally:
+            self.replaying = False
+
+    def search_prefix(self, prefix, field='lastname'):
+        """ Find the contacts whose firstname or lastname (field) starts with
+        prefix, ignoring case and accents. """
+        self.load_all()
+        if self.name_indexes is None:
+            from tact.index import PrefixIndex
+            self.name_indexes = {
+                'firstname': PrefixIndex('firstname'),
+                'lastname': PrefixIndex('lastname'),
+            }
+            for contact in self.book.values():
+                for name_index in self.name_indexes.values():
+                    name_index.add(contact)
+
+        keys = self.name_indexes[field].search(prefix)
+        return [self.book[key] for key in keys]
+
+    def search_fuzzy(self, firstname, lastname, limit=5):
+        """ Find the limit contacts whose name is the closest to the given
+        one, best first, tolerating typos. """
+        self.load_all()
+        # The search allocates many short-lived objects, which would make
+        # the collector scan the whole book over and over
+        with util.paused_gc():
+            if self.trigram_index is None:
+                self.trigram_index = self._make_trigram_index()
+
+            results = self.trigram_index.search(
+                "{} {}".format(firstname, lastname), limit)
+        return [self.book[key] for score, key in results]
+
+    def _make_trigram_index(self):
+        """ Gets a trigram index of the book, the one kept by its storage
+        when there is one, brought up to date with the contacts created or
+        deleted since loaded. """
+        from tact.index import TrigramIndex
+
+        index = None
+        if self.storage is not None:
+            index = self.storage.load_trigram_index(self)
+        if index is None:
+            return TrigramIndex.build(list(self.book))
+
+        for key in self.deleted:
+            index.remove_key(key)
+        for key in self.created:
+            index.add(self.book[key])
+
+        return index
+
+    def load_all(self):
+        """ Load into the book every contact of the source not loaded yet. """
+        if self.source is None:
+            return
+
+        source, self.source = self.source, None
+        with util.paused_gc():
+            for contact in source.iter_contacts():
+                if contact.key not in self.deleted:
+                    self.append_contact(contact)
+
+    def _fetch(self, firstname, lastname):
+        """ Fetch a contact from the source into the book. """
+        if (firstname, lastname) in self.deleted:
+            return None
+
+        contact = self.source.find(firstname, lastname)
+        if contact:
+            self.append_contact(contact)
+
+        return contact
+
+    def _fetch_all(self, keys):
+        """ Gets the contacts with the given keys, fetched from the source
+        when they are not loaded yet. """
+        contacts = []
+        for key in keys:
+            contact = self.book.get(key) or self._fetch(*key)
+            if contact:
+                contacts.append(contact)
+
+        return contacts
+
+    def index_phone(self, contact, phone):
+        """ Reference a phone number of contact in the reverse index. """
+        if self.phone_index is None:
+            return
+        canonical = ContactChecker.canonical_phone(phone)
+        self.phone_index.setdefault(canonical, {})[contact.key] = contact
+
+    def unindex_phone(self, contact, phone):
+        """ Dereference a phone number of contact from the reverse index,
+        unless the contact still owns an equivalent number. """
+        if self.phone_index is None:
+            return
+        canonical = ContactChecker.canonical_phone(phone)
+        for other_phone in contact.phones:
+            if ContactChecker.canonical_phone(other_phone) == canonical:
+                return
+        self._unindex(self.phone_index, canonical, contact)
+
+    def index_email(self, contact, email):
+        """ Reference an email address of contact in the reverse index. """
+        if self.email_index is None:
+            return
+        canonical = ContactChecker.canonical_email(email)
+        self.email_index.setdefault(canonical, {})[contact.key] = contact
+
+    def unindex_email(self, contact, email):
+        """ Dereference an email address of contact from the reverse index,
+        unless the contact still owns an equivalent address. """
+        if self.email_index is None:
+            return
+        canonical = ContactChecker.canonical_email(email)
+        for other_email in contact.emails:
+            if ContactChecker.canonical_email(other_email) == canonical:
+                return
+        self._unindex(self.email_index, canonical, contact)
+
+    def _build_reverse_indexes(self):
+        """ Build the phone and email reverse indexes from the whole book. """
+        self.phone_index = {}
+        self.email_index = {}
+        for contact in self.book.values():
+            for phone in contact.phones:
+                self.index_phone(contact, phone)
+            for email in contact.emails:
+                self.index_email(contact, email)
+
+    @staticmethod
+    def _unindex(index, canonical, contact):
+        """ Remove contact from the entry canonical of a reverse index. """
+        contacts = index.get(canonical)
+        if contacts:
+            contacts.pop(contact.key, None)
+            if not contacts:
+                del index[canonical]
+
+    def _register(self, contact):
+        """ Store contact in the book and in every index. """
+        self.book[contact.key] = contact
+        contact.address_book = self
+        if self.name_indexes is not None:
+            for name_index in self.name_indexes.values():
+                name_index.add(contact)
+        if self.trigram_index is not None:
+            self.trigram_index.add(contact)
+        if self.phone_index is not None:
+            for phone in contact.phones:
+                self.index_phone(contact, phone)
+            for email in contact.emails:
+                self.index_email(contact, email)
+
+    def _unregister(self, contact):
+        """ Remove contact from the book and from every index. """
+        del self.book[contact.key]
+        contact.address_book = None
+        if self.name_indexes is not None:
+            for name_index in self.name_indexes.values():
+                name_index.remove(contact)
+        if self.trigram_index is not None:
+            self.trigram_index.remove(contact)
+        if self.phone_index is not None:
+            for phone in contact.phones:
+                self._unindex(
+                    self.phone_index,
+                    ContactChecker.canonical_phone(phone), contact)
+            for email in contact.emails:
+                self._unindex(
+                    self.email_index,
+                    ContactChecker.canonical_email(email), contact)
+
     def __repr__(self):
-        return "<AddressBook {} >" .format(self.book)
+        if self.source is None:
+            return "<AddressBook {} >" .format(list(self.book.values()))
+
+        # Loading the contacts left in the source would change the book
+        return "<AddressBook {} contacts loaded from {} {} >".format(
+            len(self.book), type(self.source).__name__,
+            self.source.data_dir)
 
 
 # -----------------------------------------------------------------------------
@@ -123,49 +437,137 @@ class AddressBook:
 # -----------------------------------------------------------------------------
 class AddressBookManager:
 
-    """ This manager will load and save data from a CSV file to build/store
-    the list of contacts contained into the address book. """
+    """ This manager will load and save data from the configured storage
+    backend to build/store the list of contacts contained into the address
+    book:
+     - csv: a CSV file, with a journal and a binary cache (see CsvBackend)
+     - mmap: memory-mapped data and index files (see MmapStore)
+     - sqlite: a SQLite database (see SqliteStore)
+     - sharded: CSV files partitioned by lastname (see ShardedBackend) """
 
     DATA_DIR = os.path.join(exe_dir, 'data')
-    DATA_FILE = os.path.join(DATA_DIR, 'tact.csv')
-    DATA_HEADER = ['Firstname', 'Lastname', 'Home Address', 'Emails', 'Phones']
+    JOURNAL = util.load_config().getboolean('storage', 'journal')
+    CACHE = util.load_config().getboolean('storage', 'cache')
+    BACKEND = util.load_config().get('storage', 'backend')
+    BACKENDS = ['csv', 'mmap', 'sqlite', 'sharded']
+    SHARDS = util.load_config().getint('storage', 'shards')
+    WORKERS = util.load_config().getint('storage', 'workers')
+
+    @staticmethod
+    def get_backend(name=None):
+        """ Gets the storage backend called name, the configured one by
+        default. """
+        name = name or AddressBookManager.BACKEND
+        data_dir = AddressBookManager.DATA_DIR
+
+        if name == 'csv':
+            from tact.storage import CsvBackend
+            return CsvBackend(
+                data_dir,
+                journal=AddressBookManager.JOURNAL,
+                cache=AddressBookManager.CACHE)
+        elif name == 'mmap':
+            from tact.mmapstore import MmapStore
+            return MmapStore(data_dir)
+        elif name == 'sqlite':
+            from tact.sqlitestore import SqliteStore
+            return SqliteStore(data_dir)
+        elif name == 'sharded':
+            from tact.shardstore import ShardedBackend
+            return ShardedBackend(
+                data_dir,
+                nb_shards=AddressBookManager.SHARDS,
+                workers=AddressBookManager.WORKERS,
+                cache=AddressBookManager.CACHE)
+
+        raise AddressBookError("Unknown storage backend {}.".format(name))
 
     @staticmethod
     def make_address_book():
-        """ Build an AddressBook with data from a CSV file. """
-        address_book = AddressBook()
+        """ Build an AddressBook from the configured backend. """
+        return AddressBookManager.get_backend().load_address_book()
+
+    @staticmethod
+    def save_address_book(address_book):
+        """ Save the changes of address book into the configured backend.
+        Nothing is written when the book has not changed. If another process
+        has saved the book since it was loaded, its changes are applied
+        again on a fresh copy of the book, which is saved instead while the
+        storage stays locked. Gets the saved book. """
+        backend = address_book.source or AddressBookManager.get_backend()
+        try:
+            backend.save_address_book(address_book)
+            return address_book
+        except ConflictError as error:
+            LOG.warning("%s Changes applied again.", error)
+
+        return backend.save_changes(address_book.changes)
 
-        if os.path.exists(AddressBookManager.DATA_FILE):
-            with open(AddressBookManager.DATA_FILE, newline='') as csv_data:
-                reader = csv.reader(
-                    csv_data, delimiter=';', quoting=csv.QUOTE_ALL)
+    @staticmethod
+    def iter_contacts():
+        """ Yield the contacts of the address book one by one, without
+        building the whole AddressBook in memory. """
+        backend = AddressBookManager.get_backend()
+        with backend.lock():
+            yield from backend.iter_contacts()
 
-                # Skip header
-                next(reader)
+    @staticmethod
+    def find_contact(firstname, lastname):
+        """ Find a contact without loading the whole address book. """
+        backend = AddressBookManager.get_backend()
+        with backend.lock():
+            search_contact = backend.find(firstname, lastname)
 
-                for line in reader:
-                    contact = ContactFactory.make_contact(line)
-                    address_book.append_contact(contact)
-        else:
-            LOG.info(
-                "There is no contact previously saved, "
-                "this is a brand new address book.")
+        if not search_contact:
+            LOG.warning(
+                "Contact %s %s doesn't exist.", firstname, lastname)
 
-        return address_book
+        return search_contact
 
     @staticmethod
-    def save_address_book(address_book):
-        """ Save address book on disk into a CSV file. """
-        if not os.path.exists(AddressBookManager.DATA_DIR):
-            os.mkdir(AddressBookManager.DATA_DIR)
+    def compact():
+        """ Reclaim the space used by the configured backend. """
+        backend = AddressBookManager.get_backend()
+        with backend.lock(exclusive=True):
+            backend.compact()
+
+    @staticmethod
+    def convert(target, origin=None):
+        """ Copy the address book from the origin backend (the configured one
+        by default) to the target backend. """
+        origin = origin or AddressBookManager.BACKEND
+        if origin == target:
+            raise AddressBookError(
+                "The Address Book is already stored as {}.".format(target))
+
+        # Both backends share the lock of the data directory
+        target_backend = AddressBookManager.get_backend(target)
+        with target_backend.lock(exclusive=True), util.paused_gc():
+            target_backend.write(
+                AddressBookManager.get_backend(origin).iter_contacts())
+
+        LOG.info(
+            "Address Book converted from %s to %s, set 'backend = %s' in "
+            "Config/tact.conf to use it.", origin, target, target)
+
+    @staticmethod
+    def reshard(nb_shards, origin=None):
+        """ Split the address book of the origin backend (the configured one
+        by default), which may be a single file or the shards themselves,
+        into nb_shards shards. """
+        origin = origin or AddressBookManager.BACKEND
+        if nb_shards < 1:
+            raise AddressBookError("There must be at least one shard.")
 
-        book_data = [AddressBookManager.DATA_HEADER] \
-            + address_book.export_data()
+        target_backend = AddressBookManager.get_backend('sharded')
+        with target_backend.lock(exclusive=True), util.paused_gc():
+            target_backend.write(
+                AddressBookManager.get_backend(origin).iter_contacts(),
+                nb_shards)
 
-        with open(AddressBookManager.DATA_FILE, 'w', newline='') as data:
-            writer = csv.writer(
-                data, delimiter=';', quoting=csv.QUOTE_ALL)
-            writer.writerows(book_data)
+        LOG.info(
+            "Address Book split from %s into %s shards, set 'backend = "
+            "sharded' in Config/tact.conf to use it.", origin, nb_shards)
 
 
 # -----------------------------------------------------------------------------
@@ -178,18 +580,32 @@ class Contact:
     """ Create a new contact (firstname and lastname are obligatory and in
         that order). """
 
+    # No per-instance __dict__: a contact only holds these attributes
+    __slots__ = (
+        'firstname', 'lastname', 'mailing_address', 'emails', 'phones',
+        'address_book')
+
     def __init__(
             self,
-            firstname, lastname, mailing_address="", emails=[], phones=[]):
-        """ Initialisation """
+            firstname, lastname, mailing_address="", emails=[], phones=[],
+            check=True, failures=None):
+        """ Initialisation (phones and emails already validated can skip
+        the checks with check=False, invalid ones are appended to failures
+        if given) """
 
         self.firstname = firstname
         self.lastname = lastname
         self.mailing_address = mailing_address
-        self.phones = [
-            phone for phone in phones if ContactChecker.check_phone(phone)]
-        self.emails = [
-            email for email in emails if ContactChecker.check_email(email)]
+        # Phones and emails are tuples, shared with the cache data and the
+        # empty tuple singleton, and replaced as a whole when changed
+        if check:
+            self.phones = tuple(ContactChecker.check_phones(phones, failures))
+            self.emails = tuple(ContactChecker.check_emails(emails, failures))
+        else:
+            self.phones = tuple(phones)
+            self.emails = tuple(emails)
+        # AddressBook holding the contact, notified of phone/email changes
+        self.address_book = None
 
     def export_data(self):
         """ Export data as a list. """
@@ -201,33 +617,69 @@ class Contact:
             "|".join(self.phones)
         ]
 
+    def export_cache(self):
+        """ Export data as a tuple of marshallable values. """
+        return (
+            self.firstname,
+            self.lastname,
+            self.mailing_address,
+            self.emails,
+            self.phones
+        )
+
     def add_phone(self, new_phone):
         """ Add the new_phone number in the list of phones of the contact. """
         if new_phone and ContactChecker.check_phone(new_phone):
-            self.phones.append(new_phone)
+            self.phones += (new_phone,)
+            if self.address_book is not None:
+                self.address_book.index_phone(self, new_phone)
+                self.address_book.record('add_phone', self, new_phone)
 
     def remove_phone(self, old_phone):
         """ remove the old_phone number in the list of phones of the contact.
         if this number exist """
         if old_phone in self.phones:
-            self.phones.remove(old_phone)
+            self.phones = Contact.without(self.phones, old_phone)
+            if self.address_book is not None:
+                self.address_book.unindex_phone(self, old_phone)
+                self.address_book.record('remove_phone', self, old_phone)
 
     def add_email(self, new_email):
         """ Add the new_email in the list of emails of the contact. """
         if new_email and ContactChecker.check_email(new_email):
-            self.emails.append(new_email)
+            self.emails += (new_email,)
+            if self.address_book is not None:
+                self.address_book.index_email(self, new_email)
+                self.address_book.record('add_email', self, new_email)
 
     def remove_email(self, old_email):
         """ remove the old_email address in the list of emails of the contact.
         if this email exist """
         if old_email in self.emails:
-            self.emails.remove(old_email)
+            self.emails = Contact.without(self.emails, old_email)
+            if self.address_book is not None:
+                self.address_book.unindex_email(self, old_email)
+                self.address_book.record('remove_email', self, old_email)
+
+    @staticmethod
+    def without(values, value):
+        """ Gets the tuple values without the first occurrence of value. """
+        position = values.index(value)
+        return values[:position] + values[position + 1:]
+
+    @property
+    def key(self):
+        """ Key identifying the contact in an AddressBook. """
+        return (self.firstname, self.lastname)
 
     def __eq__(self, other):
         return (
             self.firstname == other.firstname
             and self.lastname == other.lastname)
 
+    def __hash__(self):
+        return hash(self.key)
+
     def __str__(self):
         to_display = "{} {}\n".format(self.firstname, self.lastname)
         if self.mailing_address:
@@ -253,8 +705,10 @@ class ContactFactory:
     """ Build contact object. """
 
     @staticmethod
-    def make_contact(data):
-        """ Create a Contact instance thanks to raw data. """
+    def make_contact(data, failures=None, strings=None):
+        """ Create a Contact instance thanks to raw data. Invalid phones and
+        emails are appended to failures if given. Mailing address, emails
+        and phones are deduplicated through the strings table if given. """
         firstname = data[0]
         lastname = data[1]
         mailing_address = data[2]
@@ -267,7 +721,37 @@ class ContactFactory:
         else:
             phones = []
 
-        return Contact(firstname, lastname, mailing_address, emails, phones)
+        if strings is not None:
+            mailing_address = strings.setdefault(
+                mailing_address, mailing_address)
+            emails = ContactFactory.intern(emails, strings)
+            phones = ContactFactory.intern(phones, strings)
+
+        return Contact(
+            firstname, lastname, mailing_address, emails, phones,
+            failures=failures)
+
+    @staticmethod
+    def make_checked_contact(data, strings=None):
+        """ Create a Contact instance thanks to data exported by
+        Contact.export_cache, already validated. Mailing address, emails and
+        phones are deduplicated through the strings table if given. """
+        if strings is not None:
+            data = (
+                data[0], data[1], strings.setdefault(data[2], data[2]),
+                ContactFactory.intern(data[3], strings),
+                ContactFactory.intern(data[4], strings))
+
+        return Contact(*data, check=False)
+
+    @staticmethod
+    def intern(values, strings):
+        """ Gets values as the equal strings first seen in the strings
+        table, a dictionary shared by all the contacts of a load. """
+        if not values:
+            return values
+
+        return [strings.setdefault(value, value) for value in values]
 
 
 # -----------------------------------------------------------------------------
@@ -281,29 +765,110 @@ class ContactChecker:
 
     PHONE_RE = r"^0[0-9]([ .-]?[0-9]{2}){4}$"
     EMAIL_RE = r"^[A-Za-z1-9]+@[a-z]+[.][a-z]+$"
+    PHONE_PATTERN = re.compile(PHONE_RE)
+    EMAIL_PATTERN = re.compile(EMAIL_RE)
+
+    @staticmethod
+    def is_phone(phone):
+        """ Tell if a phone number has the right format, without logging. """
+        return ContactChecker.PHONE_PATTERN.search(phone) is not None
+
+    @staticmethod
+    def is_email(email):
+        """ Tell if an email address has the right format, without
+        logging. """
+        return ContactChecker.EMAIL_PATTERN.search(email) is not None
 
     @staticmethod
     def check_phone(phone):
         """ Check if a phone number has the right format. """
-        check = True
+        stats.count('validations')
+        check = ContactChecker.is_phone(phone)
 
-        if re.search(ContactChecker.PHONE_RE, phone) is None:
-            check = False
-            LOG.error("{} is not a phone number.".format(phone))
+        if not check:
+            CHECK_LOG.error("%s is not a phone number.", phone)
 
         return check
 
     @staticmethod
     def check_email(email):
         """ Check if an email address has the right format. """
-        check = True
+        stats.count('validations')
+        check = ContactChecker.is_email(email)
 
-        if re.search(ContactChecker.EMAIL_RE, email) is None:
-            check = False
-            LOG.error("{} is not a correct email address.".format(email))
+        if not check:
+            CHECK_LOG.error("%s is not a correct email address.", email)
 
         return check
 
+    @staticmethod
+    def partition(values, pattern):
+        """ Gets the values of an iterable matching pattern, and the others,
+        running the pattern once on each value. """
+        search = pattern.search
+        valid = []
+        rejected = []
+        for value in values:
+            (valid if search(value) else rejected).append(value)
+
+        return valid, rejected
+
+    @staticmethod
+    def check_phones(phones, failures=None):
+        """ Gets the phone numbers having the right format. Rejected ones are
+        appended to failures if given, logged at once otherwise. """
+        valid, rejected = ContactChecker.partition(
+            phones, ContactChecker.PHONE_PATTERN)
+        if stats.ENABLED:
+            stats.count('validations', len(valid) + len(rejected))
+        if rejected:
+            ContactChecker.report(
+                rejected, failures, "%s are not phone numbers.")
+
+        return valid
+
+    @staticmethod
+    def check_emails(emails, failures=None):
+        """ Gets the email addresses having the right format. Rejected ones
+        are appended to failures if given, logged at once otherwise. """
+        valid, rejected = ContactChecker.partition(
+            emails, ContactChecker.EMAIL_PATTERN)
+        if stats.ENABLED:
+            stats.count('validations', len(valid) + len(rejected))
+        if rejected:
+            ContactChecker.report(
+                rejected, failures, "%s are not correct email addresses.")
+
+        return valid
+
+    @staticmethod
+    def report(rejected, failures, message):
+        """ Collect rejected values into failures, or log them in a single
+        line with message when failures is None. Each kind of values has
+        its own message, which the rate limit of CHECK_LOG tells apart. """
+        if failures is not None:
+            failures.extend(rejected)
+        else:
+            CHECK_LOG.error(message, ", ".join(rejected))
+
+    @staticmethod
+    def log_failures(failures, source):
+        """ Log a summary of the values rejected while reading source. """
+        if failures:
+            LOG.error(
+                "%s invalid phone numbers or email addresses skipped in %s, "
+                "e.g. %s.", len(failures), source, ", ".join(failures[:5]))
+
+    @staticmethod
+    def canonical_phone(phone):
+        """ Get the digits of a phone number, without any separator. """
+        return re.sub(r"\D", "", phone)
+
+    @staticmethod
+    def canonical_email(email):
+        """ Get the lowercased form of an email address. """
+        return email.strip().lower()
+
 
 # -----------------------------------------------------------------------------
 #
@@ -319,4 +884,8 @@ class AddressBookError(Exception):
     pass
 
 
+class ConflictError(AddressBookError):
+    pass
+
+
 # EOF
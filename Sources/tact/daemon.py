@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : daemon.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import io
+import os
+import json
+import time
+import signal
+import socket
+import logging
+import contextlib
+import socketserver
+
+from tact import cli
+from tact.core import AddressBookManager
+
+# Logger
+LOG = logging.getLogger(__name__)
+
+# Socket of the daemon, in the data directory
+SOCKET_FILE = 'tact.sock'
+
+# Commands forwarded to the daemon when it is running
+COMMANDS = cli.BOOK_COMMANDS
+
+# Commands writing the storage by themselves, refused while the daemon runs
+EXCLUSIVE_COMMANDS = [
+    'batch', 'compact', 'convert', 'http', 'reshard', 'serve']
+
+
+# -----------------------------------------------------------------------------
+#
+# Module methods
+#
+# -----------------------------------------------------------------------------
+def socket_path():
+    """ Gets the path of the socket of the daemon. """
+    return os.path.join(AddressBookManager.DATA_DIR, SOCKET_FILE)
+
+
+def connect():
+    """ Gets a socket connected to the daemon, None if it is not running. """
+    path = socket_path()
+    if not os.path.exists(path):
+        return None
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except OSError:
+        # Socket left behind by a daemon which has been killed
+        client.close()
+        return None
+
+    return client
+
+
+def is_running():
+    """ Tell if a daemon is listening on the socket. """
+    client = connect()
+    if client is None:
+        return False
+
+    client.close()
+    return True
+
+
+def forward(argv):
+    """ Run a command line in the daemon and print its output. Gets its exit
+    status, None if no daemon is running, so the command has to be run
+    locally. """
+    client = connect()
+    if client is None:
+        return None
+
+    with client:
+        request = {'argv': argv, 'cwd': os.getcwd()}
+        client.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        with client.makefile('rb') as answer:
+            reply = answer.readline()
+
+    if not reply:
+        raise ConnectionError("The tact daemon did not answer.")
+
+    reply = json.loads(reply.decode('utf-8'))
+    print(reply['output'], end='')
+    return reply['status']
+
+
+def serve(parser):
+    """ Run a daemon on the socket until it gets SIGINT or SIGTERM, then save
+    the pending changes. Gets the exit status, 1 when another daemon is
+    already running. """
+    path = socket_path()
+    if is_running():
+        LOG.error("A tact daemon is already running on %s.", path)
+        return 1
+    if os.path.exists(path):
+        os.remove(path)
+    if not os.path.exists(AddressBookManager.DATA_DIR):
+        os.mkdir(AddressBookManager.DATA_DIR)
+
+    server = TactServer(path, parser)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    LOG.info("tact daemon listening on %s.", path)
+    try:
+        server.serve_forever(poll_interval=TactServer.COMMIT_DELAY)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.commit()
+        server.server_close()
+        os.remove(path)
+        LOG.info("tact daemon stopped.")
+
+    return 0
+
+
+# -----------------------------------------------------------------------------
+#
+# CommandHandler class
+#
+# -----------------------------------------------------------------------------
+class CommandHandler(socketserver.StreamRequestHandler):
+
+    """ Run the command line sent by a client, as a JSON object holding its
+    arguments and working directory, and answer its output. """
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            # Connection only checking that the daemon runs (is_running)
+            return
+
+        request = json.loads(line.decode('utf-8'))
+        output, status = self.server.run_command(
+            request['argv'], request['cwd'])
+        self.wfile.write(json.dumps(
+            {'output': output, 'status': status}).encode('utf-8') + b"\n")
+
+
+# -----------------------------------------------------------------------------
+#
+# TactServer class
+#
+# -----------------------------------------------------------------------------
+class TactServer(socketserver.UnixStreamServer):
+
+    """ Hold the address book in memory and run the commands of the clients
+    one at a time, with the arguments parser of the CLI.
+
+    Clients get their answer before the changes are saved: changes are saved
+    in groups, COMMIT_DELAY after the first unsaved one, between two
+    commands. """
+
+    # Seconds a change may wait to be saved along with the next ones
+    COMMIT_DELAY = 0.1
+
+    def __init__(self, path, parser):
+        """ Initialisation """
+        self.parser = parser
+        self.address_book = AddressBookManager.make_address_book()
+        # Time of the first change not saved yet
+        self.dirty_since = None
+        super().__init__(path, CommandHandler)
+
+    def run_command(self, argv, cwd):
+        """ Run a command line against the address book. Gets what it prints
+        and logs, and its exit status, as the CLI would. """
+        status = 0
+        output = io.StringIO()
+        handler = logging.StreamHandler(output)
+        handler.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
+        logger = logging.getLogger('tact')
+        logger.addHandler(handler)
+        try:
+            with contextlib.redirect_stdout(output), \
+                    contextlib.redirect_stderr(output):
+                args = self.parser.parse_args(argv)
+                if args.command not in COMMANDS:
+                    raise ValueError(
+                        "The daemon does not run the {} command.".format(
+                            args.command))
+                if args.command == 'import':
+                    args.file = os.path.join(cwd, args.file)
+                args.book = self.address_book
+                args.func(args)
+        except SystemExit as exit:
+            # Raised by argparse, which has already printed the error
+            status = exit.code if isinstance(exit.code, int) else 2
+        except Exception as error:
+            LOG.exception(error)
+            status = 2
+        finally:
+            logger.removeHandler(handler)
+
+        if self.dirty_since is None and self.address_book.is_dirty():
+            self.dirty_since = time.monotonic()
+
+        return output.getvalue(), status
+
+    def service_actions(self):
+        """ Save the changes once the oldest one has waited COMMIT_DELAY. """
+        if (self.dirty_since is not None
+                and time.monotonic() - self.dirty_since
+                >= TactServer.COMMIT_DELAY):
+            self.commit()
+
+    def commit(self):
+        """ Save the changes of the address book, if any. """
+        try:
+            self.address_book = AddressBookManager.save_address_book(
+                self.address_book)
+            self.dirty_since = None
+        except Exception as error:
+            # The changes are kept, and saved along with the next ones
+            LOG.exception(error)
+            self.dirty_since = time.monotonic()
+
+
+# EOF
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : dedupe.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import logging
+
+from tact.core import ContactChecker
+from tact.index import fold
+from tact.index import TrigramIndex
+
+# Logger
+LOG = logging.getLogger(__name__)
+
+# Contacts sharing a blocking key beyond which the key is too common to tell
+# duplicates apart (e.g. the switchboard of a company), and is skipped
+MAX_BLOCK_SIZE = 50
+
+# Score from which two contacts are taken for the same person
+THRESHOLD = 0.8
+
+# Added to the similarity of the names for a shared phone number, and for a
+# shared email address
+PHONE_WEIGHT = 0.25
+EMAIL_WEIGHT = 0.25
+
+
+# -----------------------------------------------------------------------------
+#
+# Module methods
+#
+# -----------------------------------------------------------------------------
+def normalize_name(firstname, lastname):
+    """ Gets a name regardless of case, accents, spacing and of the order of
+    its words. """
+    return " ".join(sorted(fold("{} {}".format(firstname, lastname)).split()))
+
+
+def blocking_keys(contact):
+    """ Gets the keys shared by the contacts which may be duplicates of
+    contact: its normalized name, its phone digits and its lowercased email
+    addresses. """
+    keys = {('name', normalize_name(contact.firstname, contact.lastname))}
+    keys.update(
+        ('phone', ContactChecker.canonical_phone(phone))
+        for phone in contact.phones)
+    keys.update(
+        ('email', ContactChecker.canonical_email(email))
+        for email in contact.emails)
+
+    return keys
+
+
+def candidate_pairs(contacts, max_block_size=MAX_BLOCK_SIZE):
+    """ Gets the pairs of contact keys sharing a blocking key, and the number
+    of blocks skipped for having more than max_block_size contacts. Only
+    contacts of a same block are compared, so the pairs grow with the size
+    of the book rather than with its square. """
+    blocks = {}
+    for contact in contacts:
+        for block_key in blocking_keys(contact):
+            blocks.setdefault(block_key, []).append(contact.key)
+
+    pairs = set()
+    skipped = 0
+    for keys in blocks.values():
+        if len(keys) < 2:
+            continue
+        if len(keys) > max_block_size:
+            skipped += 1
+            continue
+        keys.sort()
+        for i, first in enumerate(keys):
+            for second in keys[i + 1:]:
+                pairs.add((first, second))
+
+    return pairs, skipped
+
+
+def profile(contact):
+    """ Gets what score() compares of a contact: the trigrams of its
+    normalized name, its phone digits and its lowercased emails. """
+    return (
+        TrigramIndex.trigrams(
+            normalize_name(contact.firstname, contact.lastname)),
+        set(map(ContactChecker.canonical_phone, contact.phones)),
+        set(map(ContactChecker.canonical_email, contact.emails)))
+
+
+def score_profiles(first, second):
+    """ Gets the score of two contacts from their profiles. """
+    first_grams, first_phones, first_emails = first
+    second_grams, second_phones, second_emails = second
+    similarity = 2 * len(first_grams & second_grams) / (
+        len(first_grams) + len(second_grams))
+    reasons = ["name {:.2f}".format(similarity)]
+
+    total = similarity
+    if first_phones & second_phones:
+        total += PHONE_WEIGHT
+        reasons.append("phone")
+    if first_emails & second_emails:
+        total += EMAIL_WEIGHT
+        reasons.append("email")
+
+    return min(total, 1.0), reasons
+
+
+def score(first, second):
+    """ Gets how likely two contacts are the same person, between 0 and 1,
+    and the reasons why: the similarity of their names (Dice coefficient of
+    their trigrams), raised by their shared phone numbers and emails. """
+    return score_profiles(profile(first), profile(second))
+
+
+def find_duplicates(address_book, threshold=THRESHOLD):
+    """ Gets the pairs of contacts of address book scoring threshold or more,
+    as (score, first contact, second contact, reasons), best first. """
+    address_book.load_all()
+    pairs, skipped = candidate_pairs(address_book.book.values())
+    if skipped:
+        LOG.warning(
+            "%s names, phone numbers or emails shared by more than %s "
+            "contacts have not been compared.", skipped, MAX_BLOCK_SIZE)
+
+    # A contact is in as many pairs as it has candidates: profile it once
+    profiles = {}
+    for key in {key for pair in pairs for key in pair}:
+        profiles[key] = profile(address_book.book[key])
+
+    duplicates = []
+    for first_key, second_key in pairs:
+        total, reasons = score_profiles(
+            profiles[first_key], profiles[second_key])
+        if total >= threshold:
+            duplicates.append((
+                total, address_book.book[first_key],
+                address_book.book[second_key], reasons))
+
+    duplicates.sort(key=lambda duplicate: (
+        -duplicate[0], duplicate[1].key, duplicate[2].key))
+    return duplicates
+
+
+def group(duplicates):
+    """ Gets the groups of contacts linked, even indirectly, by pairs of
+    duplicates, as lists of contacts. """
+    # Union-find over the contact keys
+    parents = {}
+
+    def find(key):
+        parents.setdefault(key, key)
+        while parents[key] != key:
+            parents[key] = parents[parents[key]]
+            key = parents[key]
+        return key
+
+    contacts = {}
+    for _, first, second, _ in duplicates:
+        contacts[first.key] = first
+        contacts[second.key] = second
+        parents[find(first.key)] = find(second.key)
+
+    groups = {}
+    for key in sorted(contacts):
+        groups.setdefault(find(key), []).append(contacts[key])
+
+    return list(groups.values())
+
+
+def merge(address_book, contacts):
+    """ Merge a group of duplicates into one of them, which gets the phone
+    numbers and emails of the others, then remove the others. The contact
+    kept is the one with a mailing address and the most details. Gets it. """
+    kept = max(contacts, key=lambda contact: (
+        bool(contact.mailing_address),
+        len(contact.phones) + len(contact.emails)))
+
+    phones = set(map(ContactChecker.canonical_phone, kept.phones))
+    emails = set(map(ContactChecker.canonical_email, kept.emails))
+    for contact in contacts:
+        if contact is kept:
+            continue
+        for phone in contact.phones:
+            if ContactChecker.canonical_phone(phone) not in phones:
+                phones.add(ContactChecker.canonical_phone(phone))
+                kept.add_phone(phone)
+        for email in contact.emails:
+            if ContactChecker.canonical_email(email) not in emails:
+                emails.add(ContactChecker.canonical_email(email))
+                kept.add_email(email)
+        address_book.remove_contact(contact.firstname, contact.lastname)
+
+    return kept
+
+
+def dedupe(address_book, threshold=THRESHOLD, apply=False):
+    """ Find the duplicates of address book, and merge them if apply is set.
+    Gets the pairs of duplicates and the groups found. """
+    duplicates = find_duplicates(address_book, threshold)
+    groups = group(duplicates)
+    if apply:
+        for contacts in groups:
+            merge(address_book, contacts)
+
+    return duplicates, groups
+
+
+# EOF
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : export.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import sys
+import csv
+import json
+
+from tact import stats
+
+# Size of the buffer of the files exported to
+BUFFER_SIZE = 1024 * 1024
+
+
+# -----------------------------------------------------------------------------
+#
+# Module methods
+#
+# -----------------------------------------------------------------------------
+def write_csv(contacts, output, header=None):
+    """ Write contacts one by one into output, in the tact.csv layout. """
+    writer = csv.writer(output, delimiter=';', quoting=csv.QUOTE_ALL)
+    if header:
+        writer.writerow(header)
+    for contact in contacts:
+        writer.writerow(contact.export_data())
+
+
+def as_dict(contact):
+    """ Gets a contact as a dictionary of JSON values. """
+    return {
+        'firstname': contact.firstname,
+        'lastname': contact.lastname,
+        'mailing_address': contact.mailing_address or "",
+        'emails': list(contact.emails),
+        'phones': list(contact.phones),
+    }
+
+
+def write_jsonl(contacts, output):
+    """ Write contacts one by one into output, as JSON Lines. """
+    for contact in contacts:
+        output.write(json.dumps(as_dict(contact), ensure_ascii=False))
+        output.write("\n")
+
+
+def vcard_escape(text):
+    """ Escape a text value of a vCard property. """
+    return (
+        (text or "").replace("\\", "\\\\").replace(";", "\\;")
+        .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def write_vcard(contacts, output):
+    """ Write contacts one by one into output, as vCard 3.0. """
+    for contact in contacts:
+        firstname = vcard_escape(contact.firstname)
+        lastname = vcard_escape(contact.lastname)
+        lines = [
+            "BEGIN:VCARD",
+            "VERSION:3.0",
+            "N:{};{};;;".format(lastname, firstname),
+            "FN:{} {}".format(firstname, lastname),
+        ]
+        if contact.mailing_address:
+            lines.append(
+                "ADR:;;{};;;;".format(vcard_escape(contact.mailing_address)))
+        for email in contact.emails:
+            lines.append("EMAIL;TYPE=INTERNET:{}".format(vcard_escape(email)))
+        for phone in contact.phones:
+            lines.append("TEL:{}".format(vcard_escape(phone)))
+        lines.append("END:VCARD")
+        output.write("\r\n".join(lines) + "\r\n")
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'vcard': write_vcard,
+}
+
+
+def export(contacts, file_format, output):
+    """ Write contacts into output in file_format (csv, jsonl or vcard). """
+    if file_format == 'csv':
+        from tact.storage import CsvBackend
+        write_csv(contacts, output, CsvBackend.DATA_HEADER)
+    else:
+        WRITERS[file_format](contacts, output)
+
+
+def export_file(contacts, file_format, path=None):
+    """ Write contacts into the file at path, or the standard output if path
+    is None, through a large write buffer. """
+    if path is None:
+        export(contacts, file_format, sys.stdout)
+        sys.stdout.flush()
+        return
+
+    with open(path, 'w', newline='', encoding='utf-8',
+              buffering=BUFFER_SIZE) as output:
+        export(contacts, file_format, output)
+        stats.count('bytes written', output.tell())
+
+
+# EOF
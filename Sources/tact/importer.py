@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : importer.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import os
+import csv
+import json
+import time
+import logging
+import itertools
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from tact import util
+from tact import stats
+from tact.core import ContactChecker
+from tact.core import ContactFactory
+from tact.storage import CsvBackend
+
+# Logger
+LOG = logging.getLogger(__name__)
+
+# Number of rows validated at once by a worker
+CHUNK_SIZE = 10000
+
+
+# -----------------------------------------------------------------------------
+#
+# Module methods
+#
+# -----------------------------------------------------------------------------
+def guess_format(path):
+    """ Gets the format of a file to import from its extension. """
+    if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+
+    return 'csv'
+
+
+def read_chunks(path, file_format, chunk_size=CHUNK_SIZE):
+    """ Yield the records of a file by chunks of chunk_size. CSV records are
+    parsed rows (tact.csv layout, header optional), JSON Lines records are
+    raw lines, parsed by the workers. """
+    with open(path, newline='', encoding='utf-8') as data:
+        if file_format == 'csv':
+            records = csv.reader(data, delimiter=';', quoting=csv.QUOTE_ALL)
+            # The header of a tact.csv file is not a contact
+            first_record = next(records, None)
+            if first_record and first_record != CsvBackend.DATA_HEADER:
+                records = itertools.chain([first_record], records)
+        else:
+            records = (line for line in data if line.strip())
+
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def parse_record(record, file_format):
+    """ Gets (firstname, lastname, mailing address, emails, phones) from a
+    record of a file to import. """
+    if file_format == 'csv':
+        emails = record[3].split('|') if record[3] else []
+        phones = record[4].split('|') if record[4] else []
+        return record[0], record[1], record[2], emails, phones
+
+    data = json.loads(record)
+    return (
+        data['firstname'], data['lastname'],
+        data.get('mailing_address') or "",
+        list(data.get('emails') or []), list(data.get('phones') or []))
+
+
+def validate_chunk(chunk, file_format):
+    """ Validate a chunk of records, without logging each failure. Gets the
+    valid contacts data, as exported by Contact.export_cache, and the number
+    of rejected records. A record is rejected when it can not be parsed, has
+    no name, a value which is not a string, or a malformed phone number or
+    email address. """
+    valid = []
+    rejected = 0
+    for record in chunk:
+        try:
+            firstname, lastname, mailing_address, emails, phones = \
+                parse_record(record, file_format)
+        except (IndexError, KeyError, TypeError, ValueError):
+            rejected += 1
+            continue
+
+        # JSON values may be of any type, while the CSV file holds strings
+        if (not all(isinstance(value, str) for value in itertools.chain(
+                (firstname, lastname, mailing_address), emails, phones))
+                or not firstname or not lastname
+                or not all(map(ContactChecker.is_phone, phones))
+                or not all(map(ContactChecker.is_email, emails))):
+            rejected += 1
+            continue
+
+        valid.append((
+            firstname, lastname, mailing_address,
+            tuple(emails), tuple(phones)))
+
+    return valid, rejected
+
+
+def iter_validated(chunks, file_format, jobs):
+    """ Yield the result of validate_chunk for every chunk, in order. With
+    several jobs, chunks are validated by a process pool, keeping a bounded
+    number of chunks in flight. """
+    if jobs <= 1:
+        for chunk in chunks:
+            yield validate_chunk(chunk, file_format)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(validate_chunk, chunk, file_format))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def import_file(address_book, path, file_format=None, jobs=None):
+    """ Import the contacts of a CSV or JSON Lines file into address book.
+    Contacts whose name is already in the book, or earlier in the file, are
+    skipped. Gets a report dictionary. """
+    file_format = file_format or guess_format(path)
+    jobs = jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    # Duplicates are detected with the hash table of the whole book
+    address_book.load_all()
+
+    report = {'rows': 0, 'imported': 0, 'rejected': 0, 'duplicates': 0}
+    strings = {}
+    chunks = read_chunks(path, file_format)
+    with util.paused_gc():
+        for valid, rejected in iter_validated(chunks, file_format, jobs):
+            report['rows'] += len(valid) + rejected
+            report['rejected'] += rejected
+            if stats.ENABLED:
+                # Values of the accepted rows, checked by the workers
+                stats.count('validations', sum(
+                    len(data[3]) + len(data[4]) for data in valid))
+            for data in valid:
+                if (data[0], data[1]) in address_book.book:
+                    report['duplicates'] += 1
+                    continue
+                contact = ContactFactory.make_checked_contact(data, strings)
+                address_book.append_contact(contact)
+                address_book.record(
+                    'add_contact', contact, *contact.export_data()[2:])
+                report['imported'] += 1
+
+    stats.count('rows parsed', report['rows'])
+    report['seconds'] = time.perf_counter() - start
+    report['rows_per_second'] = report['rows'] / max(report['seconds'], 1e-9)
+    if report['rejected']:
+        LOG.warning(
+            "%s rows of %s have been rejected.", report['rejected'], path)
+
+    return report
+
+
+# EOF
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : index.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import sys
+import math
+import bisect
+import heapq
+import unicodedata
+
+from array import array
+from collections import Counter
+
+
+# -----------------------------------------------------------------------------
+#
+# Module methods
+#
+# -----------------------------------------------------------------------------
+def fold(text):
+    """ Gets a case and accent insensitive form of text. """
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return "".join(
+        char for char in decomposed
+        if not unicodedata.combining(char)).casefold()
+
+
+# -----------------------------------------------------------------------------
+#
+# PrefixIndex class
+#
+# -----------------------------------------------------------------------------
+class PrefixIndex:
+
+    """ Sorted index of a text attribute of contacts, answering prefix
+    queries with a binary search. """
+
+    def __init__(self, attribute):
+        """ Initialisation """
+        self.attribute = attribute
+        # Sorted list of (folded value, contact key)
+        self.entries = []
+        # Contacts added since the last query, not indexed yet
+        self.pending = []
+
+    def _entry(self, contact):
+        """ Gets the index entry of a contact. """
+        return (fold(getattr(contact, self.attribute)), contact.key)
+
+    def _flush(self):
+        """ Merge pending contacts into the sorted entries. A few contacts
+        are inserted one by one, a bulk load is sorted at once. """
+        if len(self.pending) < 16:
+            for contact in self.pending:
+                bisect.insort(self.entries, self._entry(contact))
+        else:
+            self.entries.extend(
+                self._entry(contact) for contact in self.pending)
+            self.entries.sort()
+        self.pending = []
+
+    def add(self, contact):
+        """ Reference a contact in the index. """
+        self.pending.append(contact)
+
+    def remove(self, contact):
+        """ Dereference a contact from the index. """
+        self._flush()
+        entry = self._entry(contact)
+        position = bisect.bisect_left(self.entries, entry)
+        if position < len(self.entries) and self.entries[position] == entry:
+            del self.entries[position]
+
+    def search(self, prefix):
+        """ Gets the keys of the contacts whose attribute starts with prefix,
+        sorted by attribute. """
+        self._flush()
+        folded = fold(prefix)
+        position = bisect.bisect_left(self.entries, (folded,))
+        keys = []
+        while position < len(self.entries):
+            value, key = self.entries[position]
+            if not value.startswith(folded):
+                break
+            keys.append(key)
+            position += 1
+
+        return keys
+
+
+# -----------------------------------------------------------------------------
+#
+# TrigramIndex class
+#
+# -----------------------------------------------------------------------------
+class TrigramIndex:
+
+    """ Inverted index from the trigrams of the full name of contacts to
+    their keys, answering typo tolerant searches. Contacts are numbered in
+    the order they are indexed, and each trigram holds the array of the
+    numbers of its contacts, which can be saved and loaded as bytes (see
+    dump and load). Only the contacts sharing enough trigrams with the
+    query are scored. """
+
+    # Version of the layout of dump, with the byte order of its arrays
+    VERSION = (1, sys.byteorder)
+
+    def __init__(self, keys=()):
+        """ Initialisation (keys are the keys of the contacts numbered from
+        0, already in the postings) """
+        # Contact number -> contact key
+        self.keys = list(keys)
+        # Trigram -> array of contact numbers, or its bytes until searched
+        self.postings = {}
+        # Contact number -> number of distinct trigrams of its name
+        self.sizes = array('H')
+        # Keys removed, whose numbers are left in the postings
+        self.removed = set()
+
+    @staticmethod
+    def trigrams(name):
+        """ Gets the set of trigrams of a name, padded so that the beginning
+        and the end of words weigh more. """
+        padded = "  {} ".format(" ".join(fold(name).split()))
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    @staticmethod
+    def full_name(key):
+        """ Gets the name of a contact key as indexed. """
+        return "{} {}".format(*key)
+
+    @classmethod
+    def build(cls, keys):
+        """ Gets the index of the contacts with the given keys. """
+        index = cls(keys)
+        postings = {}
+        sizes = []
+        for number, key in enumerate(index.keys):
+            grams = cls.trigrams(cls.full_name(key))
+            for gram in grams:
+                postings.setdefault(gram, []).append(number)
+            sizes.append(len(grams))
+
+        index.postings = {
+            gram: array('I', numbers) for gram, numbers in postings.items()}
+        index.sizes = array('H', (min(size, 0xFFFF) for size in sizes))
+        return index
+
+    def dump(self):
+        """ Gets the index as marshallable values, without the keys and the
+        removed keys, which the index must not have. """
+        return (
+            TrigramIndex.VERSION,
+            {gram: bytes(numbers) for gram, numbers in self.postings.items()},
+            self.sizes.tobytes())
+
+    @classmethod
+    def load(cls, data, keys):
+        """ Gets the index dumped as data, of the contacts with the given
+        keys. Gets None if data has another layout. """
+        version, postings, sizes = data
+        if version != TrigramIndex.VERSION:
+            return None
+
+        index = cls(keys)
+        index.postings = postings
+        index.sizes.frombytes(sizes)
+        return index
+
+    def _posting(self, gram):
+        """ Gets the array of the contact numbers of a trigram. """
+        numbers = self.postings.get(gram, ())
+        if isinstance(numbers, bytes):
+            numbers = self.postings[gram] = array('I', numbers)
+
+        return numbers
+
+    def add(self, contact):
+        """ Reference a contact in the index. """
+        number = len(self.keys)
+        self.keys.append(contact.key)
+        self.removed.discard(contact.key)
+        grams = self.trigrams(self.full_name(contact.key))
+        for gram in grams:
+            self._posting(gram)
+            self.postings.setdefault(gram, array('I')).append(number)
+        self.sizes.append(min(len(grams), 0xFFFF))
+
+    def remove(self, contact):
+        """ Dereference a contact from the index. """
+        self.remove_key(contact.key)
+
+    def remove_key(self, key):
+        """ Dereference the contact with the given key from the index. """
+        self.removed.add(key)
+
+    def search(self, name, limit=5, threshold=0.3):
+        """ Gets the keys of the limit contacts whose name is the closest to
+        name, best first, as (score, key) pairs. The score is the Dice
+        coefficient of the trigram sets, between 0 and 1. """
+        grams = self.trigrams(name)
+        # A contact scoring threshold shares min_overlap trigrams or more
+        # with name, so at least one of the rarest ones: the postings of the
+        # min_overlap - 1 most frequent trigrams need not be read. These
+        # trigrams are only counted for the contacts which may still score.
+        min_overlap = max(
+            1, math.ceil(threshold * len(grams) / (2 - threshold)))
+        by_frequency = sorted(grams, key=lambda gram: len(self._posting(gram)))
+        frequent = set(by_frequency[len(grams) - min_overlap + 1:])
+
+        common = Counter()
+        for gram in by_frequency[:len(grams) - min_overlap + 1]:
+            common.update(self._posting(gram))
+
+        # Contacts are scored by decreasing number of trigrams in common,
+        # until even sharing all the frequent ones could not make one of them
+        # score better than the limit found so far
+        scores = {}
+        best = []
+        for number, count in common.most_common():
+            most = count + len(frequent)
+            if len(best) == limit and 2 * most / (len(grams) + most) < best[0]:
+                break
+            size = len(grams) + self.sizes[number]
+            if 2 * most < threshold * size:
+                continue
+            key = self.keys[number]
+            # A key indexed again after its removal has the same score
+            if key in self.removed or key in scores:
+                continue
+            if frequent:
+                count += len(frequent & self.trigrams(self.full_name(key)))
+            score = 2 * count / size
+            if score >= threshold:
+                scores[key] = score
+                if len(best) < limit:
+                    heapq.heappush(best, score)
+                elif score > best[0]:
+                    heapq.heapreplace(best, score)
+
+        return heapq.nlargest(
+            limit, ((score, key) for key, score in scores.items()),
+            key=lambda item: item[0])
+
+
+# EOF
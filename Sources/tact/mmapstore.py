@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : mmapstore.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import os
+import mmap
+import struct
+import logging
+
+from array import array
+
+from tact import stats
+from tact.core import ContactFactory
+from tact.storage import StorageBackend
+
+# Logger
+LOG = logging.getLogger(__name__)
+
+# Length of a record, followed by its UTF-8 payload
+RECORD_HEADER = struct.Struct('<I')
+# Offset of a record in the data file, in native byte order like the array
+# and memoryview of offsets which the index is read and written with
+OFFSET_FORMAT = 'Q'
+OFFSET = struct.Struct('=' + OFFSET_FORMAT)
+# Separator of the fields of a record payload
+FIELD_SEPARATOR = '\x1f'
+
+
+# -----------------------------------------------------------------------------
+#
+# MmapStore class
+#
+# -----------------------------------------------------------------------------
+class MmapStore(StorageBackend):
+
+    """ Store contacts as records in a data file, along with an index file
+    holding the offsets of the records sorted by contact name. Both files are
+    memory-mapped, so a lookup is a binary search over the index followed by
+    the decoding of a single record.
+
+    The data file is append-only: an updated contact is appended again and
+    its offset replaced in the index. Dead records are dropped by write(). """
+
+    DATA_FILE = 'tact.dat'
+    INDEX_FILE = 'tact.idx'
+
+    def __init__(self, data_dir):
+        """ Initialisation """
+        super().__init__(data_dir)
+        self.data_file = os.path.join(data_dir, MmapStore.DATA_FILE)
+        self.index_file = os.path.join(data_dir, MmapStore.INDEX_FILE)
+
+    def exists(self):
+        """ Tell if the store has been written. """
+        return os.path.exists(self.index_file)
+
+    @staticmethod
+    def make_key(firstname, lastname):
+        """ Gets the key of a contact, as compared in the index. """
+        return "{}{}{}".format(
+            firstname, FIELD_SEPARATOR, lastname).encode('utf-8')
+
+    @staticmethod
+    def encode(contact):
+        """ Encode a contact as a record. """
+        payload = FIELD_SEPARATOR.join(
+            field or "" for field in contact.export_data()).encode('utf-8')
+        return RECORD_HEADER.pack(len(payload)) + payload
+
+    @staticmethod
+    def read_payload(data, offset):
+        """ Gets the payload of the record at offset of data. """
+        length, = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        return data[start:start + length]
+
+    @staticmethod
+    def read_key(data, offset):
+        """ Gets the key of the record at offset of data. """
+        payload = MmapStore.read_payload(data, offset)
+        separator = FIELD_SEPARATOR.encode('utf-8')
+        end = payload.index(separator, payload.index(separator) + 1)
+        return payload[:end]
+
+    @staticmethod
+    def read_contact(data, offset):
+        """ Decode the record at offset of data as a Contact. """
+        fields = MmapStore.read_payload(data, offset).decode('utf-8').split(
+            FIELD_SEPARATOR)
+        return ContactFactory.make_checked_contact((
+            fields[0], fields[1], fields[2],
+            fields[3].split('|') if fields[3] else [],
+            fields[4].split('|') if fields[4] else []))
+
+    @staticmethod
+    def search(data, offsets, key):
+        """ Binary search of key among the records at offsets of data. Gets
+        the position of key in offsets (or where to insert it) and whether it
+        has been found. """
+        low, high = 0, len(offsets)
+        while low < high:
+            middle = (low + high) // 2
+            if MmapStore.read_key(data, offsets[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        found = (
+            low < len(offsets)
+            and MmapStore.read_key(data, offsets[low]) == key)
+
+        return low, found
+
+    def _map(self, path):
+        """ Memory-map a file read-only. Gets an empty bytes object when the
+        file is missing or empty, since mmap can not map it. """
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return b''
+
+        with open(path, 'rb') as data:
+            return mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def find(self, firstname, lastname):
+        """ Find a contact reading only the index and its record. """
+        data = self._map(self.data_file)
+        index = self._map(self.index_file)
+        offsets = memoryview(index).cast(OFFSET_FORMAT) if index else ()
+        try:
+            position, found = MmapStore.search(
+                data, offsets, MmapStore.make_key(firstname, lastname))
+            if found:
+                return MmapStore.read_contact(data, offsets[position])
+        finally:
+            if index:
+                offsets.release()
+                index.close()
+            if data:
+                data.close()
+
+        return None
+
+    def iter_contacts(self):
+        """ Yield the contacts one by one, sorted by name. """
+        data = self._map(self.data_file)
+        index = self._map(self.index_file)
+        if not index:
+            if data:
+                data.close()
+            return
+
+        offsets = memoryview(index).cast(OFFSET_FORMAT)
+        try:
+            for offset in offsets:
+                yield MmapStore.read_contact(data, offset)
+        finally:
+            offsets.release()
+            index.close()
+            data.close()
+
+    def write(self, contacts):
+        """ Write the whole store from scratch with contacts. """
+        if not os.path.exists(self.data_dir):
+            os.mkdir(self.data_dir)
+
+        entries = []
+        offset = 0
+        with open(self.data_file + '.tmp', 'wb') as data:
+            for contact in contacts:
+                record = MmapStore.encode(contact)
+                data.write(record)
+                entries.append(
+                    (MmapStore.make_key(*contact.key), offset))
+                offset += len(record)
+
+        entries.sort()
+        offsets = array(OFFSET_FORMAT, (offset for key, offset in entries))
+        with open(self.index_file + '.tmp', 'wb') as index:
+            stats.count('bytes written', offset + index.write(
+                offsets.tobytes()))
+
+        os.replace(self.data_file + '.tmp', self.data_file)
+        os.replace(self.index_file + '.tmp', self.index_file)
+
+    def update(self, address_book):
+        """ Persist the contacts created, modified or deleted in address_book.
+        Their records are appended to the data file and the offsets of
+        modified contacts are patched in place in the index, which is only
+        rewritten when contacts are created or deleted. """
+        if not self.exists():
+            self.write(address_book.book.values())
+            return
+
+        # Append the records of new and updated contacts
+        new_offsets = {}
+        with open(self.data_file, 'ab') as data:
+            offset = start = data.tell()
+            for key in address_book.created | address_book.modified:
+                record = MmapStore.encode(address_book.book[key])
+                data.write(record)
+                new_offsets[key] = offset
+                offset += len(record)
+        stats.count('bytes written', offset - start)
+
+        # Edits of the index, as (position, 1 to delete or 0 to insert, key,
+        # offset), applied from the end so that positions stay valid
+        edits = []
+        data = self._map(self.data_file)
+        with open(self.index_file, 'r+b') as index_file:
+            if os.path.getsize(self.index_file):
+                index = mmap.mmap(index_file.fileno(), 0)
+                offsets = memoryview(index).cast(OFFSET_FORMAT)
+            else:
+                index = None
+                offsets = array(OFFSET_FORMAT)
+
+            try:
+                for key in address_book.deleted:
+                    key = MmapStore.make_key(*key)
+                    position, found = MmapStore.search(data, offsets, key)
+                    if found:
+                        edits.append((position, 1, key, None))
+
+                for key, offset in new_offsets.items():
+                    key = MmapStore.make_key(*key)
+                    position, found = MmapStore.search(data, offsets, key)
+                    if found:
+                        offsets[position] = offset
+                        stats.count('bytes written', OFFSET.size)
+                    else:
+                        edits.append((position, 0, key, offset))
+
+                if edits:
+                    new_index = array(OFFSET_FORMAT, offsets)
+            finally:
+                if index:
+                    offsets.release()
+                    index.close()
+                if data:
+                    data.close()
+
+        if edits:
+            for position, delete, key, offset in sorted(edits, reverse=True):
+                if delete:
+                    del new_index[position]
+                else:
+                    new_index.insert(position, offset)
+
+            with open(self.index_file + '.tmp', 'wb') as index_file:
+                stats.count('bytes written', index_file.write(
+                    new_index.tobytes()))
+            os.replace(self.index_file + '.tmp', self.index_file)
+
+        LOG.debug(
+            "%s records appended, index %s.",
+            len(new_offsets), "rewritten" if edits else "patched")
+
+
+# EOF
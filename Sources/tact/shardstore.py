@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : shardstore.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import os
+import zlib
+import shutil
+import logging
+
+from tact import util
+from tact.core import AddressBook
+from tact.core import ContactFactory
+from tact.storage import CsvBackend
+from tact.storage import StorageBackend
+
+# Logger
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+#
+# Module methods
+#
+# -----------------------------------------------------------------------------
+def load_shard(shard_dir, cache):
+    """ Load the contacts of a shard, in a worker process. Gets their data
+    exported by Contact.export_cache, which is cheaper to send back than the
+    contacts themselves. """
+    address_book = CsvBackend(
+        shard_dir, journal=False, cache=cache).make_address_book()
+    return [contact.export_cache() for contact in address_book.book.values()]
+
+
+# -----------------------------------------------------------------------------
+#
+# ShardedBackend class
+#
+# -----------------------------------------------------------------------------
+class ShardedBackend(StorageBackend):
+
+    """ Store the address book in several CSV files, the shards, each one
+    holding the contacts whose lastname hashes to it. A save only rewrites
+    the shards of the contacts created, modified or deleted, and a full load
+    reads the shards in parallel in worker processes.
+
+    Shards are CsvBackend storages without journal, under shards/ in the
+    data directory, sharing its lock and version files. Their number is
+    written in shards/tact.shards: it only changes when the book is
+    resharded, since the hash of a lastname depends on it. """
+
+    SHARDS_DIR = 'shards'
+    SHARDS_FILE = 'tact.shards'
+
+    def __init__(self, data_dir, nb_shards=16, workers=0, cache=True):
+        """ Initialisation (nb_shards is used when the shards are first
+        written, workers is the number of processes loading them, 0 for the
+        number of CPUs) """
+        super().__init__(data_dir)
+        self.shards_dir = os.path.join(data_dir, ShardedBackend.SHARDS_DIR)
+        self.shards_file = os.path.join(
+            self.shards_dir, ShardedBackend.SHARDS_FILE)
+        self.nb_shards = self.read_nb_shards() or nb_shards
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache
+
+    def exists(self):
+        """ Tell if the shards have been written. """
+        return os.path.exists(self.shards_file)
+
+    def read_nb_shards(self):
+        """ Gets the number of shards written, 0 if there is none. """
+        try:
+            with open(self.shards_file) as shards_file:
+                return int(shards_file.read())
+        except (OSError, ValueError):
+            return 0
+
+    @staticmethod
+    def shard_of(lastname, nb_shards):
+        """ Gets the shard of a lastname. CRC32 is stable across processes
+        and runs, unlike hash() of a string. """
+        return zlib.crc32(lastname.encode('utf-8')) % nb_shards
+
+    def get_shard(self, shard):
+        """ Gets the storage of a shard. """
+        return CsvBackend(
+            os.path.join(self.shards_dir, '{:03d}'.format(shard)),
+            journal=False, cache=self.cache)
+
+    def iter_shards(self):
+        """ Yield the storages of the shards written. """
+        for shard in range(self.nb_shards):
+            backend = self.get_shard(shard)
+            if backend.exists():
+                yield backend
+
+    def make_address_book(self):
+        """ Build an AddressBook from every shard, loaded by a pool of worker
+        processes, or one after the other with a single worker. """
+        address_book = AddressBook()
+        shards = list(self.iter_shards())
+        if not shards:
+            LOG.info(
+                "There is no contact previously saved, "
+                "this is a brand new address book.")
+            return address_book
+
+        workers = min(self.workers, len(shards))
+        with util.paused_gc():
+            if workers == 1:
+                for backend in shards:
+                    for contact in backend.make_address_book().book.values():
+                        address_book.append_contact(contact)
+            else:
+                from concurrent.futures import ProcessPoolExecutor
+
+                strings = {}
+                with ProcessPoolExecutor(workers) as executor:
+                    for rows in executor.map(
+                            load_shard,
+                            [backend.data_dir for backend in shards],
+                            [self.cache] * len(shards)):
+                        for row in rows:
+                            address_book.append_contact(
+                                ContactFactory.make_checked_contact(
+                                    row, strings))
+
+        return address_book
+
+    def find(self, firstname, lastname):
+        """ Find a contact reading only the shard of its lastname. """
+        backend = self.get_shard(
+            ShardedBackend.shard_of(lastname, self.nb_shards))
+        if not backend.exists():
+            return None
+
+        return backend.find(firstname, lastname)
+
+    def iter_contacts(self):
+        """ Yield the contacts one by one, shard by shard. """
+        for backend in self.iter_shards():
+            yield from backend.iter_contacts()
+
+    def write(self, contacts, nb_shards=None):
+        """ Write contacts into nb_shards shards (the current number by
+        default). Contacts are all read before any shard is written, so that
+        they may come from the shards themselves. """
+        nb_shards = nb_shards or self.nb_shards
+        shards = [[] for _ in range(nb_shards)]
+        for contact in contacts:
+            shards[ShardedBackend.shard_of(
+                contact.lastname, nb_shards)].append(contact)
+
+        os.makedirs(self.shards_dir, exist_ok=True)
+        for shard, shard_contacts in enumerate(shards):
+            self.get_shard(shard).write(shard_contacts)
+
+        # Shards left over by a larger number of shards
+        for shard in range(nb_shards, max(self.nb_shards, nb_shards)):
+            shutil.rmtree(self.get_shard(shard).data_dir, ignore_errors=True)
+
+        with open(self.shards_file + '.tmp', 'w') as shards_file:
+            shards_file.write(str(nb_shards))
+        os.replace(self.shards_file + '.tmp', self.shards_file)
+        self.nb_shards = nb_shards
+
+    def update(self, address_book):
+        """ Rewrite the shards of the contacts created, modified or deleted
+        in address book, and only them. """
+        if not self.exists():
+            self.write(address_book.book.values())
+            return
+
+        dirty = {
+            ShardedBackend.shard_of(lastname, self.nb_shards)
+            for _, lastname in (
+                address_book.created | address_book.modified
+                | address_book.deleted)}
+        shards = {shard: [] for shard in dirty}
+        for contact in address_book.book.values():
+            shard = ShardedBackend.shard_of(contact.lastname, self.nb_shards)
+            if shard in shards:
+                shards[shard].append(contact)
+
+        for shard, shard_contacts in sorted(shards.items()):
+            self.get_shard(shard).write(shard_contacts)
+
+        LOG.debug(
+            "%s shards out of %s rewritten.", len(shards), self.nb_shards)
+
+
+# EOF
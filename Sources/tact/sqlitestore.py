@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : sqlitestore.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import os
+import sqlite3
+import logging
+import threading
+
+from tact.core import ContactChecker
+from tact.core import ContactFactory
+from tact.storage import StorageBackend
+
+# Logger
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+#
+# SqliteStore class
+#
+# -----------------------------------------------------------------------------
+class SqliteStore(StorageBackend):
+
+    """ Store contacts in a SQLite database, with B-tree indexes on names,
+    canonical phone numbers and canonical email addresses. The database runs
+    in WAL mode, so readers do not block the writer, and every query is a
+    parameterized statement kept in the connection statement cache. """
+
+    DATABASE_FILE = 'tact.db'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY,
+            firstname TEXT NOT NULL,
+            lastname TEXT NOT NULL,
+            mailing_address TEXT NOT NULL DEFAULT '',
+            UNIQUE (firstname, lastname)
+        );
+        CREATE TABLE IF NOT EXISTS phones (
+            contact_id INTEGER NOT NULL
+                REFERENCES contacts (id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            phone TEXT NOT NULL,
+            canonical TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS phones_contact
+            ON phones (contact_id, position);
+        CREATE INDEX IF NOT EXISTS phones_canonical ON phones (canonical);
+        CREATE TABLE IF NOT EXISTS emails (
+            contact_id INTEGER NOT NULL
+                REFERENCES contacts (id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            email TEXT NOT NULL,
+            canonical TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS emails_contact
+            ON emails (contact_id, position);
+        CREATE INDEX IF NOT EXISTS emails_canonical ON emails (canonical);
+    """
+
+    def __init__(self, data_dir):
+        """ Initialisation """
+        super().__init__(data_dir)
+        self.database_file = os.path.join(
+            data_dir, SqliteStore.DATABASE_FILE)
+        # A connection per thread, since the API server reads from its event
+        # loop while it saves from a worker thread
+        self.local = threading.local()
+
+    def exists(self):
+        """ Tell if the database has been created. """
+        return os.path.exists(self.database_file)
+
+    def connect(self):
+        """ Gets the connection of the current thread to the database,
+        created on first use. """
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            if not os.path.exists(self.data_dir):
+                os.mkdir(self.data_dir)
+
+            connection = sqlite3.connect(self.database_file)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("PRAGMA foreign_keys = ON")
+            connection.executescript(SqliteStore.SCHEMA)
+            self.local.connection = connection
+
+        return connection
+
+    def close(self):
+        """ Close the connection of the current thread to the database. """
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+    def find(self, firstname, lastname):
+        """ Find a contact through the unique index on names. """
+        if not self.exists():
+            return None
+
+        connection = self.connect()
+        row = connection.execute(
+            "SELECT id, mailing_address FROM contacts "
+            "WHERE firstname = ? AND lastname = ?",
+            (firstname, lastname)).fetchone()
+        if row is None:
+            return None
+
+        contact_id, mailing_address = row
+        emails = [email for email, in connection.execute(
+            "SELECT email FROM emails WHERE contact_id = ? "
+            "ORDER BY position", (contact_id,))]
+        phones = [phone for phone, in connection.execute(
+            "SELECT phone FROM phones WHERE contact_id = ? "
+            "ORDER BY position", (contact_id,))]
+
+        return ContactFactory.make_checked_contact(
+            (firstname, lastname, mailing_address, emails, phones))
+
+    def find_keys_by_phone(self, canonical_phone):
+        """ Find the keys of the contacts owning a canonical phone number. """
+        if not self.exists():
+            return []
+
+        return [tuple(row) for row in self.connect().execute(
+            "SELECT DISTINCT firstname, lastname FROM phones "
+            "JOIN contacts ON contacts.id = phones.contact_id "
+            "WHERE canonical = ?", (canonical_phone,))]
+
+    def find_keys_by_email(self, canonical_email):
+        """ Find the keys of the contacts owning a canonical email address. """
+        if not self.exists():
+            return []
+
+        return [tuple(row) for row in self.connect().execute(
+            "SELECT DISTINCT firstname, lastname FROM emails "
+            "JOIN contacts ON contacts.id = emails.contact_id "
+            "WHERE canonical = ?", (canonical_email,))]
+
+    def iter_contacts(self):
+        """ Yield the contacts one by one. Contacts, phones and emails are
+        read with three cursors ordered by contact and merged on the fly. """
+        if not self.exists():
+            return
+
+        connection = self.connect()
+        contacts = connection.execute(
+            "SELECT id, firstname, lastname, mailing_address FROM contacts "
+            "ORDER BY id")
+        phones = connection.execute(
+            "SELECT contact_id, phone FROM phones "
+            "ORDER BY contact_id, position")
+        emails = connection.execute(
+            "SELECT contact_id, email FROM emails "
+            "ORDER BY contact_id, position")
+        next_phone = next(phones, None)
+        next_email = next(emails, None)
+
+        for contact_id, firstname, lastname, mailing_address in contacts:
+            contact_phones = []
+            while next_phone is not None and next_phone[0] == contact_id:
+                contact_phones.append(next_phone[1])
+                next_phone = next(phones, None)
+
+            contact_emails = []
+            while next_email is not None and next_email[0] == contact_id:
+                contact_emails.append(next_email[1])
+                next_email = next(emails, None)
+
+            yield ContactFactory.make_checked_contact((
+                firstname, lastname, mailing_address,
+                contact_emails, contact_phones))
+
+    def _insert(self, connection, contact):
+        """ Insert a contact, its phones and its emails. """
+        contact_id = connection.execute(
+            "INSERT INTO contacts (firstname, lastname, mailing_address) "
+            "VALUES (?, ?, ?)",
+            (contact.firstname, contact.lastname,
+             contact.mailing_address or "")).lastrowid
+        self._insert_details(connection, contact_id, contact)
+
+    def _insert_details(self, connection, contact_id, contact):
+        """ Insert the phones and the emails of a contact. """
+        connection.executemany(
+            "INSERT INTO phones (contact_id, position, phone, canonical) "
+            "VALUES (?, ?, ?, ?)",
+            [(contact_id, position, phone,
+              ContactChecker.canonical_phone(phone))
+             for position, phone in enumerate(contact.phones)])
+        connection.executemany(
+            "INSERT INTO emails (contact_id, position, email, canonical) "
+            "VALUES (?, ?, ?, ?)",
+            [(contact_id, position, email,
+              ContactChecker.canonical_email(email))
+             for position, email in enumerate(contact.emails)])
+
+    def write(self, contacts):
+        """ Replace the whole content of the database with contacts, in a
+        single transaction. """
+        # Contacts may be read from this very database
+        contacts = list(contacts)
+
+        connection = self.connect()
+        with connection:
+            connection.execute("DELETE FROM contacts")
+            for contact in contacts:
+                self._insert(connection, contact)
+
+    def update(self, address_book):
+        """ Persist the contacts created, modified or deleted in address book
+        in a single transaction, touching only their rows. """
+        connection = self.connect()
+        with connection:
+            for firstname, lastname in address_book.deleted:
+                connection.execute(
+                    "DELETE FROM contacts "
+                    "WHERE firstname = ? AND lastname = ?",
+                    (firstname, lastname))
+
+            for key in address_book.created | address_book.modified:
+                contact = address_book.book[key]
+                row = connection.execute(
+                    "SELECT id FROM contacts "
+                    "WHERE firstname = ? AND lastname = ?", key).fetchone()
+                if row is None:
+                    self._insert(connection, contact)
+                    continue
+
+                contact_id, = row
+                connection.execute(
+                    "UPDATE contacts SET mailing_address = ? WHERE id = ?",
+                    (contact.mailing_address or "", contact_id))
+                connection.execute(
+                    "DELETE FROM phones WHERE contact_id = ?", (contact_id,))
+                connection.execute(
+                    "DELETE FROM emails WHERE contact_id = ?", (contact_id,))
+                self._insert_details(connection, contact_id, contact)
+
+    def compact(self):
+        """ Rebuild the database file to reclaim free pages. """
+        self.connect().execute("VACUUM")
+        LOG.info("Address Book compacted.")
+
+
+# EOF
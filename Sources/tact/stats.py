@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : stats.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import sys
+import time
+import contextlib
+
+# Seconds spent in each phase of the command, in the order first entered
+TIMES = {}
+
+# Seconds spent in the phases nested in each phase being timed
+_NESTED = []
+
+# Amounts of work done by the command, mostly counted file by file rather
+# than row by row, to stay cheap when nobody reads them
+COUNTERS = {}
+
+# Set when the counters are read: the counts on hot paths (e.g. contact by
+# contact) are only done then
+ENABLED = False
+
+
+# -----------------------------------------------------------------------------
+#
+# Module methods
+#
+# -----------------------------------------------------------------------------
+@contextlib.contextmanager
+def timed(phase):
+    """ Add the time spent in the with block to the phase, except the time
+    spent in the phases timed inside it, so that the phases add up to the
+    time of the command. """
+    start = time.perf_counter()
+    _NESTED.append(0.0)
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        TIMES[phase] = TIMES.get(phase, 0.0) + elapsed - _NESTED.pop()
+        if _NESTED:
+            _NESTED[-1] += elapsed
+
+
+def count(name, amount=1):
+    """ Add amount to the counter name. """
+    COUNTERS[name] = COUNTERS.get(name, 0) + amount
+
+
+def reset():
+    """ Forget the phases timed and the counters. """
+    TIMES.clear()
+    COUNTERS.clear()
+
+
+def report(output=None):
+    """ Write the time of each phase, then the counters, into output (the
+    standard error by default). """
+    output = output or sys.stderr
+    total = sum(TIMES.values())
+    for phase, seconds in TIMES.items():
+        output.write("{:<16} {:9.2f} ms {:5.1f} %\n".format(
+            phase, seconds * 1000, seconds * 100 / total if total else 0))
+    output.write("{:<16} {:9.2f} ms\n".format("total", total * 1000))
+    for name, amount in sorted(COUNTERS.items()):
+        output.write("{:<16} {:>9}\n".format(name, amount))
+
+
+# EOF
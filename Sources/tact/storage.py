@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : storage.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import os
+import csv
+import fcntl
+import logging
+import marshal
+import contextlib
+
+from tact import util
+from tact import stats
+from tact import export
+from tact.core import AddressBook
+from tact.core import ConflictError
+from tact.core import ContactChecker
+from tact.core import ContactFactory
+
+# Logger
+LOG = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------------------------------
+#
+# StorageBackend class
+#
+# -----------------------------------------------------------------------------
+class StorageBackend:
+
+    """ Interface of the storages of an address book, in a data directory.
+
+    A backend able to answer point queries only implements find,
+    iter_contacts, write and update: the AddressBook it makes fetches its
+    contacts on demand, and only the dirty ones are written back.
+
+    Processes share the storage through a lock file, locked shared by the
+    readers and exclusive by a writer, and a version file, incremented by
+    every save: a book saved over a version it was not loaded from would
+    lose the changes of another process. """
+
+    LOCK_FILE = 'tact.lock'
+    VERSION_FILE = 'tact.version'
+
+    def __init__(self, data_dir):
+        """ Initialisation """
+        self.data_dir = data_dir
+        self.lock_file = os.path.join(data_dir, StorageBackend.LOCK_FILE)
+        self.version_file = os.path.join(
+            data_dir, StorageBackend.VERSION_FILE)
+
+    def exists(self):
+        """ Tell if the storage has been written. """
+        raise NotImplementedError
+
+    @contextlib.contextmanager
+    def lock(self, exclusive=False):
+        """ Hold the lock of the data directory, shared by default. """
+        if not os.path.exists(self.data_dir):
+            if not exclusive:
+                # Nothing to read yet
+                yield
+                return
+            os.makedirs(self.data_dir, exist_ok=True)
+
+        with open(self.lock_file, 'a') as lock_file:
+            fcntl.flock(
+                lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read_version(self):
+        """ Gets the version of the storage, 0 if it has never been saved. """
+        try:
+            with open(self.version_file) as version:
+                return int(version.read())
+        except (OSError, ValueError):
+            return 0
+
+    def write_version(self, version):
+        """ Replace the version of the storage. """
+        with open(self.version_file + '.tmp', 'w') as version_file:
+            version_file.write(str(version))
+        os.replace(self.version_file + '.tmp', self.version_file)
+
+    def load_address_book(self):
+        """ Build an AddressBook under a shared lock, stamped with the
+        version of the storage. """
+        with self.lock():
+            address_book = self.make_address_book()
+            address_book.version = self.read_version()
+
+        return address_book
+
+    def make_address_book(self):
+        """ Build an AddressBook backed by the storage. """
+        return AddressBook(source=self)
+
+    def save_address_book(self, address_book):
+        """ Persist the changes of address book under an exclusive lock.
+        Nothing is written when the book has not changed. Raise a
+        ConflictError if the storage has been saved since the book was
+        loaded. """
+        if not address_book.is_dirty():
+            LOG.debug("Address Book unchanged, nothing to save.")
+            return
+
+        with self.lock(exclusive=True):
+            version = self.read_version()
+            if (address_book.version is not None
+                    and address_book.version != version):
+                raise ConflictError(
+                    "Address Book saved by another process since loaded.")
+
+            self.update(address_book)
+            self.write_version(version + 1)
+
+        address_book.version = version + 1
+        address_book.mark_clean()
+
+    def save_changes(self, changes):
+        """ Apply changes again on the book as currently stored, and save
+        it, all under an exclusive lock so that no other process can save
+        in between. Gets the saved book. """
+        with self.lock(exclusive=True):
+            address_book = self.make_address_book()
+            version = self.read_version()
+            for change in changes:
+                address_book.apply_change(change, record=True)
+
+            if address_book.is_dirty():
+                self.update(address_book)
+                version += 1
+                self.write_version(version)
+
+        address_book.version = version
+        address_book.mark_clean()
+        return address_book
+
+    def find(self, firstname, lastname):
+        """ Find a contact, None if it does not exist. """
+        raise NotImplementedError
+
+    def load_trigram_index(self, address_book):
+        """ Gets a TrigramIndex of the contacts of address book as loaded
+        from the storage, None when the storage keeps none. """
+        return None
+
+    def find_keys_by_phone(self, canonical_phone):
+        """ Find the keys of the contacts owning a canonical phone number.
+        Gets None when the storage has no index for it. """
+        return None
+
+    def find_keys_by_email(self, canonical_email):
+        """ Find the keys of the contacts owning a canonical email address.
+        Gets None when the storage has no index for it. """
+        return None
+
+    def iter_contacts(self):
+        """ Yield the contacts one by one. """
+        raise NotImplementedError
+
+    def write(self, contacts):
+        """ Replace the whole content of the storage with contacts. """
+        raise NotImplementedError
+
+    def update(self, address_book):
+        """ Persist the contacts created, modified or deleted in address
+        book. """
+        raise NotImplementedError
+
+    def compact(self):
+        """ Reclaim the space of the storage. """
+        self.write(self.iter_contacts())
+
+
+# -----------------------------------------------------------------------------
+#
+# CsvBackend class
+#
+# -----------------------------------------------------------------------------
+class CsvBackend(StorageBackend):
+
+    """ Store the address book in a CSV file, loaded as a whole. In journal
+    mode, changes are appended to a journal replayed over the CSV snapshot.
+    A binary cache of the validated contacts speeds up loading while the CSV
+    file is unchanged. """
+
+    DATA_FILE = 'tact.csv'
+    JOURNAL_FILE = 'tact.journal'
+    CACHE_FILE = 'tact.cache'
+    TRIGRAMS_FILE = 'tact.trigrams'
+    DATA_HEADER = ['Firstname', 'Lastname', 'Home Address', 'Emails', 'Phones']
+    CACHE_VERSION = 1
+    # Changes always appended to the journal, whatever the book size
+    JOURNAL_MIN_CHANGES = 1000
+    # Every load parses and replays the journal: it is folded into the CSV
+    # file once larger than this fraction of it, and than this many bytes
+    JOURNAL_MAX_RATIO = 0.1
+    JOURNAL_MIN_SIZE = 64 * 1024
+
+    def __init__(self, data_dir, journal=True, cache=True):
+        """ Initialisation """
+        super().__init__(data_dir)
+        self.data_file = os.path.join(data_dir, CsvBackend.DATA_FILE)
+        self.journal_file = os.path.join(data_dir, CsvBackend.JOURNAL_FILE)
+        self.cache_file = os.path.join(data_dir, CsvBackend.CACHE_FILE)
+        self.trigrams_file = os.path.join(data_dir, CsvBackend.TRIGRAMS_FILE)
+        self.journal = journal
+        self.cache = cache
+        # Keys of the contacts of the CSV file, in order, its fingerprint,
+        # and the keys of the journal changes, as last loaded
+        self.snapshot_keys = None
+        self.snapshot_fingerprint = None
+        self.journal_keys = set()
+
+    def exists(self):
+        """ Tell if the CSV file or the journal has been written. """
+        return (
+            os.path.exists(self.data_file)
+            or os.path.exists(self.journal_file))
+
+    def make_address_book(self):
+        """ Build an AddressBook with data from a CSV file, then replay the
+        journal if any. """
+        address_book = AddressBook()
+
+        with util.paused_gc():
+            if os.path.exists(self.data_file):
+                rows = self.read_cache()
+                if rows is not None:
+                    # marshal keeps the strings shared when the cache was
+                    # written, so they need no deduplication
+                    for row in rows:
+                        contact = ContactFactory.make_checked_contact(row)
+                        address_book.append_contact(contact)
+                else:
+                    failures = []
+                    strings = {}
+                    for line in self.iter_rows():
+                        contact = ContactFactory.make_contact(
+                            line, failures, strings)
+                        if contact.key in address_book.book:
+                            # Rows added by hand, only the first is kept
+                            LOG.warning(
+                                "Contact %s %s appears twice in %s, this row "
+                                "is dropped: %s", contact.firstname,
+                                contact.lastname, self.data_file,
+                                ";".join(line))
+                            continue
+                        address_book.append_contact(contact)
+                    ContactChecker.log_failures(failures, self.data_file)
+                    self.write_cache([
+                        contact.export_cache()
+                        for contact in address_book.book.values()])
+                self.snapshot_keys = list(address_book.book)
+                self.snapshot_fingerprint = self.fingerprint()
+            elif not self.exists():
+                LOG.info(
+                    "There is no contact previously saved, "
+                    "this is a brand new address book.")
+
+            for change in self.iter_journal():
+                address_book.apply_change(change)
+                self.journal_keys.add((change[1], change[2]))
+
+        address_book.storage = self
+        return address_book
+
+    def iter_rows(self):
+        """ Yield the raw rows of the CSV file one by one, without building
+        any contact. """
+        if not os.path.exists(self.data_file):
+            return
+
+        with open(self.data_file, newline='') as csv_data:
+            reader = csv.reader(
+                csv_data, delimiter=';', quoting=csv.QUOTE_ALL)
+
+            # Skip header
+            next(reader, None)
+
+            try:
+                yield from reader
+            finally:
+                stats.count('rows parsed', max(reader.line_num - 1, 0))
+
+    def iter_journal(self):
+        """ Yield the changes recorded in the journal one by one. """
+        if not os.path.exists(self.journal_file):
+            return
+
+        with open(self.journal_file, newline='') as journal:
+            reader = csv.reader(journal, delimiter=';', quoting=csv.QUOTE_ALL)
+            try:
+                yield from reader
+            finally:
+                stats.count('rows parsed', reader.line_num)
+
+    def read_journal(self):
+        """ Read the journal changes, grouped by contact key. """
+        changes = {}
+        for change in self.iter_journal():
+            changes.setdefault(tuple(change[1:3]), []).append(change)
+
+        return changes
+
+    @staticmethod
+    def replay(contact, changes):
+        """ Apply journal changes to a single contact (None if it is not in
+        the CSV file). Gets the resulting contact, None if removed. """
+        address_book = AddressBook()
+        if contact:
+            address_book.append_contact(contact)
+        for change in changes:
+            address_book.apply_change(change)
+
+        return next(iter(address_book.book.values()), None)
+
+    def iter_contacts(self):
+        """ Yield the contacts of the CSV file and its journal one by one,
+        without building the whole AddressBook in memory. """
+        journal = self.read_journal()
+
+        for line in self.iter_rows():
+            contact = ContactFactory.make_contact(line)
+            if contact.key in journal:
+                contact = CsvBackend.replay(contact, journal.pop(contact.key))
+            if contact:
+                yield contact
+
+        # Contacts only known by the journal
+        for changes in journal.values():
+            contact = CsvBackend.replay(None, changes)
+            if contact:
+                yield contact
+
+    def find(self, firstname, lastname):
+        """ Find a contact by streaming the CSV file, stopping at the first
+        match. Only the matching row is turned into a Contact. """
+        search_contact = None
+        for line in self.iter_rows():
+            if line[0] == firstname and line[1] == lastname:
+                search_contact = ContactFactory.make_contact(line)
+                break
+
+        changes = [
+            change for change in self.iter_journal()
+            if change[1] == firstname and change[2] == lastname]
+        if changes:
+            search_contact = CsvBackend.replay(search_contact, changes)
+
+        return search_contact
+
+    def update(self, address_book):
+        """ Append the changes of address book to the journal in journal
+        mode, rewrite the whole CSV file otherwise, when there are many more
+        changes than contacts loaded (e.g. after a bulk import), or when the
+        journal has grown too large. """
+        nb_changes = len(address_book.changes)
+        nb_loaded = (
+            len(address_book.book) - len(address_book.created)
+            + len(address_book.deleted))
+        if self.journal and (
+                nb_changes <= CsvBackend.JOURNAL_MIN_CHANGES
+                or nb_changes <= nb_loaded) and not self.journal_full():
+            self.append_journal(address_book)
+        else:
+            self.write(address_book.book.values())
+
+    def journal_full(self):
+        """ Tell if the journal is large enough, compared to the CSV file, to
+        be folded into it. """
+        if not os.path.exists(self.journal_file):
+            return False
+
+        data_size = (
+            os.path.getsize(self.data_file)
+            if os.path.exists(self.data_file) else 0)
+        return os.path.getsize(self.journal_file) > max(
+            CsvBackend.JOURNAL_MIN_SIZE,
+            data_size * CsvBackend.JOURNAL_MAX_RATIO)
+
+    def append_journal(self, address_book):
+        """ Append the changes of address book to the journal. """
+        with open(self.journal_file, 'a', newline='') as data:
+            start = data.tell()
+            writer = csv.writer(
+                data, delimiter=';', quoting=csv.QUOTE_ALL)
+            writer.writerows(address_book.changes)
+            stats.count('bytes written', data.tell() - start)
+
+    def write(self, contacts):
+        """ Write contacts into the CSV file. The journal, included in the
+        snapshot, is discarded. """
+        if not os.path.exists(self.data_dir):
+            os.mkdir(self.data_dir)
+
+        cache_rows = []
+        if self.cache:
+            contacts = self.collect_cache_rows(contacts, cache_rows)
+
+        with open(self.data_file + '.tmp', 'w', newline='',
+                  buffering=export.BUFFER_SIZE) as data:
+            export.write_csv(contacts, data, CsvBackend.DATA_HEADER)
+            stats.count('bytes written', data.tell())
+        os.replace(self.data_file + '.tmp', self.data_file)
+
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+
+        self.write_cache(cache_rows)
+
+    @staticmethod
+    def collect_cache_rows(contacts, cache_rows):
+        """ Yield contacts, appending their cache data to cache_rows. """
+        for contact in contacts:
+            cache_rows.append(contact.export_cache())
+            yield contact
+
+    def write_snapshot(self, address_book):
+        """ Write the whole address book into the CSV file. """
+        self.write(address_book.book.values())
+
+    def compact(self):
+        """ Fold the journal into the CSV snapshot. """
+        address_book = self.make_address_book()
+        self.write_snapshot(address_book)
+        LOG.info(
+            "Address Book compacted: %s contacts.",
+            address_book.get_nb_contacts())
+
+    def fingerprint(self):
+        """ Gets the modification time and the size of the CSV file. """
+        stat = os.stat(self.data_file)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def read_cache(self):
+        """ Read the validated contacts data from the binary cache. Gets None
+        if the cache is disabled, missing, or older than the CSV file. """
+        if not self.cache:
+            return None
+
+        try:
+            with open(self.cache_file, 'rb') as cache:
+                version, fingerprint, rows = marshal.loads(cache.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        if (version != CsvBackend.CACHE_VERSION
+                or fingerprint != self.fingerprint()):
+            LOG.debug("Binary cache is stale, CSV file will be parsed.")
+            return None
+
+        stats.count('cache rows read', len(rows))
+        return rows
+
+    def load_trigram_index(self, address_book):
+        """ Gets the TrigramIndex of the contacts of the CSV file as loaded,
+        read from the trigrams file, or built then written to it when it is
+        missing or older than the CSV file, then brought up to date with
+        the journal. Gets None when the cache is disabled. """
+        from tact.index import TrigramIndex
+
+        if not self.cache or self.snapshot_keys is None:
+            return None
+
+        index = None
+        try:
+            with open(self.trigrams_file, 'rb') as trigrams:
+                fingerprint, data = marshal.loads(trigrams.read())
+            if fingerprint == self.snapshot_fingerprint:
+                index = TrigramIndex.load(data, self.snapshot_keys)
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        if index is None:
+            LOG.debug("Trigram index is stale, it will be rebuilt.")
+            index = TrigramIndex.build(self.snapshot_keys)
+            self.replace_file(self.trigrams_file, marshal.dumps(
+                (self.snapshot_fingerprint, index.dump())))
+
+        for key in self.journal_keys:
+            if key in address_book.book:
+                index.add(address_book.book[key])
+            else:
+                index.remove_key(key)
+
+        return index
+
+    def replace_file(self, path, data):
+        """ Replace the file path with data. Readers holding the shared lock
+        may rebuild the same file at the same time: each one writes its own
+        temporary file, and a failure to replace the file only leaves it to
+        the next load. """
+        import tempfile
+
+        descriptor, temp_file = tempfile.mkstemp(
+            dir=self.data_dir, prefix=os.path.basename(path) + '.')
+        try:
+            with open(descriptor, 'wb') as output:
+                stats.count('bytes written', output.write(data))
+            os.replace(temp_file, path)
+        except OSError as error:
+            LOG.debug("%s not written: %s", path, error)
+            with contextlib.suppress(OSError):
+                os.remove(temp_file)
+
+    def write_cache(self, rows):
+        """ Write the contacts data exported by Contact.export_cache, as saved
+        in the CSV file, into the binary cache. """
+        if not self.cache:
+            return
+
+        self.replace_file(self.cache_file, marshal.dumps(
+            (CsvBackend.CACHE_VERSION, self.fingerprint(), rows)))
+
+
+# EOF
@@ -12,8 +12,13 @@
 import os
 import re
 import sys
+import gc
+import queue
+import atexit
+import functools
+import contextlib
 import logging
-import logging.config
+import configparser
 
 from codecs import open
 
@@ -38,6 +43,10 @@ def get_exe_dir():
 
 def init_logging():
     """ Loads logging configuration file and inits logging system. """
+    # Imported here, it pulls in logging.handlers, socket and pickle
+    import logging.config
+    import logging.handlers
+
     exe_dir = get_exe_dir()
 
     # Log directory
@@ -49,10 +58,84 @@ def init_logging():
     log_file = os.path.join(exe_dir, 'Config', 'logging.conf')
     # Load configuration file
     logging.config.fileConfig(log_file)
+    if load_config().getboolean('logging', 'queue'):
+        queue_file_handlers()
 
     return logging.getLogger("tact")
 
 
+def queue_file_handlers():
+    """ Hands the records of the file handlers of every logger over to a
+    background thread, through a queue. Console handlers stay synchronous,
+    so that their messages keep their place among the printed output. Gets
+    the listeners started, stopped at exit. """
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values()
+        if isinstance(logger, logging.Logger)]
+
+    queue_handlers = {}
+    for logger in loggers:
+        for handler in list(logger.handlers):
+            if not isinstance(handler, logging.FileHandler):
+                continue
+            if handler not in queue_handlers:
+                queue_handler = logging.handlers.QueueHandler(
+                    queue.SimpleQueue())
+                # Records the file handler would drop are not even queued
+                queue_handler.setLevel(handler.level)
+                queue_handlers[handler] = queue_handler
+            logger.removeHandler(handler)
+            logger.addHandler(queue_handlers[handler])
+
+    listeners = []
+    for handler, queue_handler in queue_handlers.items():
+        listener = logging.handlers.QueueListener(
+            queue_handler.queue, handler, respect_handler_level=True)
+        listener.start()
+        # Writes the queued records before the handlers are closed
+        atexit.register(listener.stop)
+        listeners.append(listener)
+
+    return listeners
+
+
+@functools.lru_cache(maxsize=None)
+def load_config():
+    """ Loads the configuration file of the application, once. Missing
+    options fall back on the defaults below. """
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'storage': {
+            'backend': 'csv',
+            'journal': 'yes',
+            'cache': 'yes',
+            'shards': '16',
+            'workers': '0',
+        },
+        'logging': {
+            'queue': 'no',
+        },
+    })
+
+    config_file = os.path.join(get_exe_dir(), 'Config', 'tact.conf')
+    config.read(config_file, encoding='utf-8')
+
+    return config
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """ Pauses the cyclic garbage collector while many long-lived objects are
+    built, since none of them can be collected meanwhile. """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
 def find_version():
     """ Finds version of the application in the __init__ file of package. """
     here = os.path.abspath(os.path.dirname(__file__))
@@ -68,4 +151,44 @@ def find_version():
         return version_match.group(1)
     raise RuntimeError("Unable to find version string.")
 
+
+# -----------------------------------------------------------------------------
+#
+# RateLimitFilter class
+#
+# -----------------------------------------------------------------------------
+class RateLimitFilter(logging.Filter):
+
+    """ Let through at most burst records of a same message per period
+    seconds, a message being told by its format string before its
+    arguments are merged. The first record let through after a period
+    tells how many similar ones have been dropped. """
+
+    def __init__(self, burst=10, period=1.0):
+        """ Initialisation """
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        # (start of the period, records let through, records dropped) by
+        # logger name and format string
+        self.windows = {}
+
+    def filter(self, record):
+        key = (record.name, record.msg)
+        start, passed, dropped = self.windows.get(key, (record.created, 0, 0))
+        if record.created - start >= self.period:
+            start, passed = record.created, 0
+
+        if passed >= self.burst:
+            self.windows[key] = (start, passed, dropped + 1)
+            return False
+
+        if dropped:
+            record.msg = "{} ({} similar messages dropped)".format(
+                record.getMessage(), dropped)
+            record.args = ()
+        self.windows[key] = (start, passed + 1, 0)
+        return True
+
+
 # EOF
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : helpers.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import tempfile
+import shutil
+
+from unittest import mock
+
+from tact.core import AddressBook
+from tact.core import AddressBookManager
+
+
+# -----------------------------------------------------------------------------
+#
+# Module methods
+#
+# -----------------------------------------------------------------------------
+def use_data_dir(test_case, **attributes):
+    """ Point AddressBookManager to a temporary data directory for the time
+    of test_case, with the csv backend and the other attributes given (e.g.
+    BACKEND='sqlite'). Gets the data directory. """
+    data_dir = tempfile.mkdtemp()
+    test_case.addCleanup(shutil.rmtree, data_dir)
+
+    attributes = dict({'DATA_DIR': data_dir, 'BACKEND': 'csv'}, **attributes)
+    for attribute, value in attributes.items():
+        patcher = mock.patch.object(AddressBookManager, attribute, value)
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+
+    return data_dir
+
+
+def make_address_book(nb_contacts=50, phones=False):
+    """ Build an AddressBook of nb_contacts numbered contacts, with an
+    address, an email and, if phones is set, a phone number. """
+    address_book = AddressBook()
+    for i in range(nb_contacts):
+        address_book.add_contact(
+            "Firstname{}".format(i), "Lastname{}".format(i),
+            "{} rue de Troy".format(i), ["first{}@test.fr".format(i + 1)],
+            ["01 23 45 67 {:02d}".format(i)] if phones else [])
+
+    return address_book
+
+
+# EOF
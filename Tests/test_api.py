@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : test_api.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import unittest
+import json
+import asyncio
+
+from unittest import mock
+
+from tact.api import ApiServer
+from tact.core import AddressBookManager
+
+import helpers
+
+
+# -----------------------------------------------------------------------------
+#
+# ApiServerTestCase class
+#
+# -----------------------------------------------------------------------------
+class ApiServerTestCase(unittest.IsolatedAsyncioTestCase):
+
+    """ Test the JSON API over HTTP. """
+
+    async def asyncSetUp(self):
+        self.data_dir = helpers.use_data_dir(self)
+
+        self.server = ApiServer(AddressBookManager.make_address_book())
+        self.http = await self.server.start('127.0.0.1', 0)
+        port = self.http.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection(
+            '127.0.0.1', port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        self.server.writer_task.cancel()
+        self.http.close()
+        await self.http.wait_closed()
+
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload else b''
+        self.writer.write(
+            "{} {} HTTP/1.1\r\nContent-Length: {}\r\n\r\n".format(
+                method, path, len(body)).encode('latin-1') + body)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def test_api(self):
+        """ Test reads and writes on a kept alive connection. """
+        status, contact = await self.request('POST', '/contacts', {
+            'firstname': "Albert", 'lastname': "Camus",
+            'phones': ["0123456789"]})
+        self.assertEqual(status, 201)
+        self.assertEqual(contact['phones'], ["0123456789"])
+        self.assertEqual(
+            (await self.request('POST', '/contacts', {
+                'firstname': "Albert", 'lastname': "Camus"}))[0], 409)
+
+        self.assertEqual((await self.request(
+            'POST', '/contacts/Albert/Camus/emails',
+            {'email': "albert@test.fr"}))[0], 201)
+        self.assertEqual((await self.request(
+            'POST', '/contacts/Albert/Camus/phones', {'phone': "12"}))[0], 400)
+        self.assertEqual((await self.request(
+            'DELETE', '/contacts/Albert/Camus/phones/0123456789'))[0], 200)
+
+        status, contact = await self.request('GET', '/contacts/Albert/Camus')
+        self.assertEqual(status, 200)
+        self.assertEqual(contact['emails'], ["albert@test.fr"])
+        self.assertEqual(contact['phones'], [])
+        self.assertEqual(
+            (await self.request('GET', '/contacts/Marie/Curie'))[0], 404)
+        self.assertEqual(
+            await self.request('GET', '/contacts?prefix=cam'),
+            (200, [contact]))
+        self.assertEqual(
+            await self.request('GET', '/contacts?email=ALBERT@test.fr'),
+            (200, [contact]))
+
+        # Writes are answered once saved
+        saved = AddressBookManager.get_backend().find("Albert", "Camus")
+        self.assertEqual(saved.emails, ("albert@test.fr",))
+
+        self.assertEqual(
+            (await self.request('DELETE', '/contacts/Albert/Camus'))[0], 200)
+        self.assertIsNone(
+            AddressBookManager.get_backend().find("Albert", "Camus"))
+
+    async def test_malformed_contact(self):
+        """ Test contacts holding values other than strings, rejected before
+        anything is saved. """
+        for payload in (
+                {'firstname': 1, 'lastname': "Camus"},
+                {'firstname': "Albert", 'lastname': "Camus",
+                 'mailing_address': ["1 rue de Troy"]},
+                {'firstname': "Albert", 'lastname': "Camus",
+                 'phones': [123]},
+                {'firstname': "Albert", 'lastname': "Camus",
+                 'emails': "albert@test.fr"}):
+            self.assertEqual(
+                (await self.request('POST', '/contacts', payload))[0], 400)
+        self.assertEqual(
+            (await self.request('POST', '/contacts', {
+                'firstname': "Albert", 'lastname': "Camus"}))[0], 201)
+        self.assertEqual((await self.request(
+            'POST', '/contacts/Albert/Camus/phones', {'phone': 123}))[0], 400)
+
+    async def test_failed_save(self):
+        """ Test writes which could not be saved, dropped from the book so
+        that a later save does not write them. """
+        with mock.patch.object(
+                AddressBookManager, 'save_address_book',
+                side_effect=OSError("No space left on device")), \
+                self.assertLogs('tact.api', 'ERROR'):
+            self.assertEqual((await self.request('POST', '/contacts', {
+                'firstname': "Albert", 'lastname': "Camus"}))[0], 500)
+        self.assertEqual(
+            (await self.request('GET', '/contacts/Albert/Camus'))[0], 404)
+
+        self.assertEqual((await self.request('POST', '/contacts', {
+            'firstname': "Marie", 'lastname': "Curie"}))[0], 201)
+        backend = AddressBookManager.get_backend()
+        self.assertIsNotNone(backend.find("Marie", "Curie"))
+        self.assertIsNone(backend.find("Albert", "Camus"))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF
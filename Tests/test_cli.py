@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : test_cli.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import unittest
+import os
+import io
+import sys
+import subprocess
+import contextlib
+
+from unittest import mock
+
+from tact import cli
+from tact.core import AddressBookManager
+from tact.core import AddressBookError
+
+import helpers
+
+
+# -----------------------------------------------------------------------------
+#
+# BatchTestCase class
+#
+# -----------------------------------------------------------------------------
+class BatchTestCase(unittest.TestCase):
+
+    """ Test running a file of commands with a single load and save. """
+
+    def setUp(self):
+        self.data_dir = helpers.use_data_dir(self)
+
+    def run_batch(self, lines):
+        path = os.path.join(self.data_dir, 'commands.txt')
+        with open(path, 'w', encoding='utf-8') as commands:
+            commands.write("\n".join(lines) + "\n")
+
+        args = cli.build_parser().parse_args(['batch', path])
+        with contextlib.redirect_stdout(io.StringIO()):
+            args.func(args)
+
+    def test_batch(self):
+        """ Test a batch saved once, at the end. """
+        with mock.patch.object(
+                AddressBookManager, 'save_address_book',
+                wraps=AddressBookManager.save_address_book) as save:
+            self.run_batch([
+                '# Comments and blank lines are skipped',
+                '',
+                'add Albert Camus -m "1 rue de Troy"',
+                'add-phone Albert Camus 0123456789',
+                'add-email Albert Camus albert@test.fr',
+                'add Marie Curie',
+                'remove Marie Curie',
+                'find Albert Camus',
+            ])
+            self.assertEqual(save.call_count, 1)
+
+        contact = AddressBookManager.find_contact("Albert", "Camus")
+        self.assertEqual(contact.mailing_address, "1 rue de Troy")
+        self.assertEqual(contact.phones, ("0123456789",))
+        self.assertEqual(contact.emails, ("albert@test.fr",))
+        self.assertIsNone(AddressBookManager.find_contact("Marie", "Curie"))
+
+    def test_batch_error(self):
+        """ Test a batch with an invalid line saving nothing. """
+        for line in ('add-phone Albert', 'compact', 'unknown'):
+            with self.assertRaises(AddressBookError), \
+                    contextlib.redirect_stderr(io.StringIO()):
+                self.run_batch(['add Albert Camus', line])
+
+        self.assertFalse(AddressBookManager.get_backend().exists())
+
+
+# -----------------------------------------------------------------------------
+#
+# StartupTestCase class
+#
+# -----------------------------------------------------------------------------
+class StartupTestCase(unittest.TestCase):
+
+    """ Test the modules left out of the start of the command line. """
+
+    def test_lazy_imports(self):
+        """ Test importing the command line in a fresh interpreter. """
+        modules = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, tact.cli; print(" ".join(sys.modules))'],
+            env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+            check=True, stdout=subprocess.PIPE,
+            universal_newlines=True).stdout.split()
+
+        for module in ('logging.config', 'shlex', 'tact.index',
+                       'tact.daemon'):
+            self.assertNotIn(module, modules)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF
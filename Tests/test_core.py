@@ -12,11 +12,26 @@
 import unittest
 import os
 import csv
+import fcntl
+import timeit
+import logging
+import tracemalloc
+import multiprocessing
 
+from unittest import mock
+
+from tact.core import CHECK_LOG
 from tact.core import AddressBook
+from tact.core import AddressBookManager
 from tact.core import Contact
+from tact.core import ContactChecker
+from tact.core import ContactFactory
+from tact.index import TrigramIndex
+from tact.storage import CsvBackend
 from tact.util import get_exe_dir
 
+import helpers
+
 
 exe_dir = get_exe_dir()
 tactcsv = os.path.join(exe_dir, 'data', 'tact.csv')
@@ -64,6 +79,84 @@ class ContactTestCase(unittest.TestCase):
         self.assertEqual(
             contact_01.mailing_address, expected_mail_address_01)
 
+    def test_check_batch(self):
+        """ Test batch validation of phones and emails, failures being
+        collected or logged at once. """
+        failures = []
+        contact = ContactFactory.make_contact(
+            ["Albert", "Einstein", "",
+             "albert@test.fr|not an email", "0123456789|12|01.23.45.67.89"],
+            failures)
+
+        self.assertEqual(contact.phones, ("0123456789", "01.23.45.67.89"))
+        self.assertEqual(contact.emails, ("albert@test.fr",))
+        self.assertEqual(failures, ["12", "not an email"])
+
+        with self.assertLogs('tact.core', 'ERROR') as logs:
+            self.assertEqual(
+                ContactChecker.check_phones(["1", "0123456789", "2"]),
+                ["0123456789"])
+        self.assertEqual(len(logs.output), 1)
+
+        # Any iterable, read once
+        failures = []
+        self.assertEqual(
+            ContactChecker.check_emails(
+                (email for email in ["albert@test.fr", "albert"]), failures),
+            ["albert@test.fr"])
+        self.assertEqual(failures, ["albert"])
+
+        # Phones and emails are not rate limited as a single message
+        rate_limit = CHECK_LOG.filters[0]
+        with mock.patch.object(rate_limit, 'burst', 1), \
+                mock.patch.dict(rate_limit.windows, clear=True), \
+                self.assertLogs('tact.core', 'ERROR') as logs:
+            ContactChecker.check_phones(["1"])
+            ContactChecker.check_emails(["albert"])
+            ContactChecker.check_phones(["2"])
+        self.assertEqual(logs.output, [
+            "ERROR:tact.core.checker:1 are not phone numbers.",
+            "ERROR:tact.core.checker:albert are not correct email "
+            "addresses."])
+
+    def test_memory_per_contact(self):
+        """ Test the memory held by a contact, compared to the former layout
+        with a __dict__ and two lists. """
+
+        class DictContact:
+            def __init__(
+                    self, firstname, lastname, mailing_address, emails,
+                    phones):
+                self.firstname = firstname
+                self.lastname = lastname
+                self.mailing_address = mailing_address
+                self.phones = list(phones)
+                self.emails = list(emails)
+                self.address_book = None
+
+        rows = [
+            ("First{}".format(i), "Last{}".format(i), "",
+             ("first{}@test.fr".format(i + 1),) if i % 2 else (),
+             ("0123456789",) if i % 3 else ())
+            for i in range(2000)]
+
+        def bytes_per_contact(make):
+            tracemalloc.start()
+            try:
+                contacts = [make(row) for row in rows]
+                size = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+            del contacts
+            return size / len(rows)
+
+        before = bytes_per_contact(lambda row: DictContact(*row))
+        after = bytes_per_contact(ContactFactory.make_checked_contact)
+        print("Bytes per contact: {:.0f} before, {:.0f} after.".format(
+            before, after))
+
+        self.assertLess(after, before / 2)
+
 
 # -----------------------------------------------------------------------------
 #
@@ -86,6 +179,499 @@ class AddressBookTestCase(unittest.TestCase):
 
         self.assertEqual(address_book.get_nb_contacts(), 2)
 
+    def test_find_contact(self):
+        """ Test finding and removing a contact by its name. """
+        address_book = AddressBook()
+        address_book.add_contact("Albert", "Einstein")
+        address_book.add_contact("Albert", "Einstein")
+
+        self.assertEqual(address_book.get_nb_contacts(), 1)
+        self.assertEqual(
+            address_book.find_contact("Albert", "Einstein"),
+            Contact("Albert", "Einstein"))
+        self.assertIsNone(address_book.find_contact("Albert", "Camus"))
+
+        address_book.remove_contact("Albert", "Einstein")
+        self.assertEqual(address_book.get_nb_contacts(), 0)
+        self.assertIsNone(address_book.find_contact("Albert", "Einstein"))
+
+    def test_find_contact_scaling(self):
+        """ Test that lookup time does not grow with the book size. """
+        def lookup_time(nb_contacts):
+            address_book = AddressBook()
+            for i in range(nb_contacts):
+                address_book.append_contact(
+                    Contact("Firstname{}".format(i), "Lastname{}".format(i)))
+            last = nb_contacts - 1
+            return min(timeit.repeat(
+                lambda: address_book.find_contact(
+                    "Firstname{}".format(last), "Lastname{}".format(last)),
+                number=1000, repeat=5))
+
+        small = lookup_time(100)
+        large = lookup_time(100000)
+
+        # A linear scan would be about 1000 times slower
+        self.assertLess(large, small * 10)
+
+    def test_reverse_lookup(self):
+        """ Test finding contacts by phone number and email address. """
+        address_book = AddressBook()
+        address_book.add_contact(
+            "Albert", "Einstein",
+            emails=["Albert@test.fr"], phones=["01 23 45 67 89"])
+        contact = address_book.find_contact("Albert", "Einstein")
+
+        self.assertEqual(address_book.find_by_phone("0123456789"), [contact])
+        self.assertEqual(
+            address_book.find_by_phone("01.23.45.67.89"), [contact])
+        self.assertEqual(
+            address_book.find_by_email("albert@test.fr"), [contact])
+
+        contact.add_phone("06-11-22-33-44")
+        contact.remove_phone("01 23 45 67 89")
+        self.assertEqual(address_book.find_by_phone("0123456789"), [])
+        self.assertEqual(address_book.find_by_phone("0611223344"), [contact])
+
+        address_book.remove_contact("Albert", "Einstein")
+        self.assertEqual(address_book.find_by_phone("0611223344"), [])
+        self.assertEqual(address_book.find_by_email("albert@test.fr"), [])
+
+    def test_search_prefix(self):
+        """ Test searching contacts by the beginning of their name. """
+        address_book = AddressBook()
+        address_book.add_contact("Nicolas", "Deutschmann")
+        address_book.add_contact("Émile", "Deuré")
+        address_book.add_contact("Albert", "Einstein")
+
+        self.assertEqual(
+            [contact.firstname
+             for contact in address_book.search_prefix("deu")],
+            ["Émile", "Nicolas"])
+        self.assertEqual(
+            address_book.search_prefix("EMI", field='firstname'),
+            [Contact("Émile", "Deuré")])
+
+        address_book.remove_contact("Émile", "Deuré")
+        self.assertEqual(
+            address_book.search_prefix("Deu"),
+            [Contact("Nicolas", "Deutschmann")])
+        self.assertEqual(address_book.search_prefix("Z"), [])
+
+    def test_search_fuzzy(self):
+        """ Test searching contacts with a mistyped name. """
+        address_book = AddressBook()
+        address_book.add_contact("Albert", "Einstein")
+        address_book.add_contact("Albert", "Camus")
+        address_book.add_contact("Nicolas", "Deutschmann")
+
+        self.assertEqual(
+            address_book.search_fuzzy("Albrt", "Einstien", 1),
+            [Contact("Albert", "Einstein")])
+        self.assertEqual(
+            address_book.search_fuzzy("nicola", "deutchman")[0],
+            Contact("Nicolas", "Deutschmann"))
+        self.assertEqual(address_book.search_fuzzy("Xyz", "Qwv"), [])
+
+        # The index follows the book once built
+        address_book.remove_contact("Albert", "Einstein")
+        address_book.add_contact("Alberta", "Einstein")
+        self.assertEqual(
+            address_book.search_fuzzy("Albrt", "Einstien", 1),
+            [Contact("Alberta", "Einstein")])
+
+    def test_search_fuzzy_pruning(self):
+        """ Test that the trigrams skipped by a search do not change its
+        scores, compared with scoring every contact. """
+        names = ["Albert", "Alberto", "Marie", "Mario", "Jean", "Jeanne"]
+        keys = [
+            (names[i % 6], "{}{}".format(names[i // 6 % 6], i % 97))
+            for i in range(2000)]
+        index = TrigramIndex.build(keys)
+
+        for query in ["Albrt Mari5", "Jeane Albert40", "Mario Jean"]:
+            grams = TrigramIndex.trigrams(query)
+            expected = sorted((
+                (2 * len(grams & other) / (len(grams) + len(other)), key)
+                for key, other in (
+                    (key, TrigramIndex.trigrams(" ".join(key)))
+                    for key in set(keys))), reverse=True)
+            found = index.search(query, limit=10)
+            self.assertEqual(
+                [score for score, key in found],
+                [score for score, key in expected[:10]])
+
+
+# -----------------------------------------------------------------------------
+#
+# AddressBookManagerTestCase class
+#
+# -----------------------------------------------------------------------------
+class AddressBookManagerTestCase(unittest.TestCase):
+
+    """ Test AddressBookManager class against a temporary data directory. """
+
+    def setUp(self):
+        helpers.use_data_dir(self)
+        self.backend = AddressBookManager.get_backend('csv')
+
+    def test_journal(self):
+        """ Test appending changes to the journal and compacting it. """
+        with mock.patch.object(AddressBookManager, 'JOURNAL', True):
+            address_book = AddressBookManager.make_address_book()
+            address_book.add_contact(
+                "Albert", "Einstein", "1 rue de Troy", ["albert@test.fr"])
+            address_book.add_contact("Albert", "Camus")
+            AddressBookManager.save_address_book(address_book)
+
+            # The journal alone is not a brand new address book
+            with mock.patch('tact.storage.LOG') as log:
+                address_book = AddressBookManager.make_address_book()
+            self.assertFalse(log.info.called)
+            address_book.add_contact_phone("Albert", "Einstein", "0123456789")
+            address_book.remove_contact("Albert", "Camus")
+            AddressBookManager.save_address_book(address_book)
+
+            self.assertFalse(os.path.exists(self.backend.data_file))
+            with open(self.backend.journal_file) as journal:
+                self.assertEqual(len(journal.readlines()), 4)
+
+            address_book = AddressBookManager.make_address_book()
+            self.assertEqual(
+                address_book.export_data(),
+                [["Albert", "Einstein", "1 rue de Troy",
+                  "albert@test.fr", "0123456789"]])
+
+            AddressBookManager.compact()
+            self.assertFalse(os.path.exists(self.backend.journal_file))
+            self.assertEqual(
+                AddressBookManager.make_address_book().export_data(),
+                address_book.export_data())
+
+    def test_journal_replay(self):
+        """ Test the journal replaying exactly the changes recorded, so that
+        the book reloaded matches the one saved, whatever the mode. """
+        for journal in (True, False):
+            self.backend.write([])
+            with mock.patch.object(AddressBookManager, 'JOURNAL', journal):
+                address_book = AddressBookManager.make_address_book()
+                address_book.add_contact(
+                    "Albert", "Camus", phones=["0123456789"])
+                AddressBookManager.save_address_book(address_book)
+
+                address_book = AddressBookManager.make_address_book()
+                address_book.add_contact_phone(
+                    "Albert", "Camus", "0123456789")
+                AddressBookManager.save_address_book(address_book)
+
+                address_book = AddressBookManager.make_address_book()
+                address_book.remove_contact_phone(
+                    "Albert", "Camus", "0123456789")
+                AddressBookManager.save_address_book(address_book)
+
+                self.assertEqual(
+                    AddressBookManager.make_address_book().find_contact(
+                        "Albert", "Camus").phones,
+                    ("0123456789",))
+
+    def test_bulk_snapshot(self):
+        """ Test a bulk of new contacts written as a snapshot rather than
+        appended to the journal. """
+        with mock.patch.object(AddressBookManager, 'JOURNAL', True), \
+                mock.patch.object(CsvBackend, 'JOURNAL_MIN_CHANGES', 10):
+            address_book = AddressBookManager.make_address_book()
+            for i in range(20):
+                address_book.add_contact(
+                    "Firstname{}".format(i), "Lastname{}".format(i))
+            AddressBookManager.save_address_book(address_book)
+            self.assertTrue(os.path.exists(self.backend.data_file))
+            self.assertFalse(os.path.exists(self.backend.journal_file))
+
+            address_book = AddressBookManager.make_address_book()
+            for i in range(20, 31):
+                address_book.add_contact(
+                    "Firstname{}".format(i), "Lastname{}".format(i))
+            AddressBookManager.save_address_book(address_book)
+            self.assertTrue(os.path.exists(self.backend.journal_file))
+            self.assertEqual(
+                AddressBookManager.make_address_book().get_nb_contacts(), 31)
+
+    def test_journal_folding(self):
+        """ Test the journal folded into the CSV file once it has grown too
+        large compared to it. """
+        with mock.patch.object(AddressBookManager, 'JOURNAL', True), \
+                mock.patch.object(CsvBackend, 'JOURNAL_MIN_SIZE', 0):
+            self.backend.write_snapshot(helpers.make_address_book())
+            data_size = os.path.getsize(self.backend.data_file)
+
+            phones = 0
+            while not self.backend.journal_full():
+                address_book = AddressBookManager.make_address_book()
+                address_book.add_contact_phone(
+                    "Firstname1", "Lastname1", "01234567{:02d}".format(phones))
+                AddressBookManager.save_address_book(address_book)
+                phones += 1
+            self.assertGreater(
+                os.path.getsize(self.backend.journal_file),
+                data_size * CsvBackend.JOURNAL_MAX_RATIO)
+
+            address_book = AddressBookManager.make_address_book()
+            address_book.add_contact("Albert", "Camus")
+            AddressBookManager.save_address_book(address_book)
+            self.assertFalse(os.path.exists(self.backend.journal_file))
+
+            address_book = AddressBookManager.make_address_book()
+            self.assertEqual(
+                len(address_book.find_contact(
+                    "Firstname1", "Lastname1").phones), phones)
+            self.assertEqual(address_book.get_nb_contacts(), 51)
+
+    def test_trigram_index(self):
+        """ Test the trigram index kept next to the CSV file, brought up to
+        date with the journal and the changes not saved yet. """
+        address_book = AddressBookManager.make_address_book()
+        address_book.add_contact("Albert", "Einstein")
+        address_book.add_contact("Marie", "Curie")
+        self.backend.write_snapshot(address_book)
+
+        address_book = AddressBookManager.make_address_book()
+        self.assertEqual(
+            address_book.search_fuzzy("Albrt", "Einstien", 1),
+            [Contact("Albert", "Einstein")])
+        self.assertTrue(os.path.exists(self.backend.trigrams_file))
+
+        with mock.patch.object(AddressBookManager, 'JOURNAL', True):
+            address_book.remove_contact("Albert", "Einstein")
+            address_book.add_contact("Alberta", "Einstein")
+            AddressBookManager.save_address_book(address_book)
+
+        address_book = AddressBookManager.make_address_book()
+        address_book.add_contact("Pierre", "Curie")
+        with mock.patch.object(
+                TrigramIndex, 'build', wraps=TrigramIndex.build) as build:
+            self.assertEqual(
+                address_book.search_fuzzy("Albrt", "Einstien", 5),
+                [Contact("Alberta", "Einstein")])
+            self.assertEqual(
+                address_book.search_fuzzy("Pierre", "Curi", 1),
+                [Contact("Pierre", "Curie")])
+            self.assertEqual(build.call_count, 0)
+
+    def test_dirty_tracking(self):
+        """ Test that read-only commands write nothing and that changes are
+        saved as a delta. """
+        address_book = AddressBookManager.make_address_book()
+        for i in range(100):
+            address_book.add_contact(
+                "Firstname{}".format(i), "Lastname{}".format(i))
+        self.backend.write_snapshot(address_book)
+
+        def data_dir_state():
+            return sorted(
+                (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+                for entry in os.scandir(AddressBookManager.DATA_DIR))
+
+        # A find writes nothing at all
+        state = data_dir_state()
+        address_book = AddressBookManager.make_address_book()
+        self.assertIsNotNone(
+            address_book.find_contact("Firstname5", "Lastname5"))
+        self.assertFalse(address_book.is_dirty())
+        with mock.patch('builtins.open') as mock_open:
+            AddressBookManager.save_address_book(address_book)
+            self.assertEqual(mock_open.call_count, 0)
+        self.assertEqual(data_dir_state(), state)
+
+        # A change only writes its own record
+        address_book.add_contact_email(
+            "Firstname5", "Lastname5", "first@test.fr")
+        address_book.remove_contact("Firstname6", "Lastname6")
+        address_book.add_contact("Albert", "Einstein")
+        self.assertEqual(address_book.modified, {("Firstname5", "Lastname5")})
+        self.assertEqual(address_book.deleted, {("Firstname6", "Lastname6")})
+        self.assertEqual(address_book.created, {("Albert", "Einstein")})
+
+        with mock.patch.object(AddressBookManager, 'JOURNAL', True):
+            AddressBookManager.save_address_book(address_book)
+        self.assertFalse(address_book.is_dirty())
+        with open(self.backend.journal_file) as journal:
+            self.assertEqual(len(journal.readlines()), 3)
+        self.assertEqual(
+            os.stat(self.backend.data_file).st_mtime_ns,
+            dict((name, mtime) for name, size, mtime in state)['tact.csv'])
+
+    def test_streaming_find(self):
+        """ Test finding a contact without loading the whole book. """
+        address_book = AddressBookManager.make_address_book()
+        for i in range(100):
+            address_book.add_contact(
+                "Firstname{}".format(i), "Lastname{}".format(i))
+        self.backend.write_snapshot(address_book)
+
+        with mock.patch.object(
+                ContactFactory, 'make_contact',
+                wraps=ContactFactory.make_contact) as make_contact:
+            contact = AddressBookManager.find_contact(
+                "Firstname10", "Lastname10")
+            self.assertEqual(contact, Contact("Firstname10", "Lastname10"))
+            self.assertEqual(make_contact.call_count, 1)
+
+        # Journal changes are applied to the streamed contacts
+        address_book = AddressBookManager.make_address_book()
+        address_book.add_contact_phone(
+            "Firstname10", "Lastname10", "0123456789")
+        address_book.remove_contact("Firstname20", "Lastname20")
+        address_book.add_contact("Albert", "Einstein")
+        with mock.patch.object(AddressBookManager, 'JOURNAL', True):
+            AddressBookManager.save_address_book(address_book)
+
+        self.assertEqual(
+            AddressBookManager.find_contact(
+                "Firstname10", "Lastname10").phones,
+            ("0123456789",))
+        self.assertIsNone(
+            AddressBookManager.find_contact("Firstname20", "Lastname20"))
+        self.assertIsNotNone(
+            AddressBookManager.find_contact("Albert", "Einstein"))
+        self.assertEqual(
+            [contact.export_data()
+             for contact in AddressBookManager.iter_contacts()],
+            AddressBookManager.make_address_book().export_data())
+
+    def test_duplicate_rows(self):
+        """ Test a name written twice in the CSV file, whose second row is
+        dropped with a warning. """
+        with open(self.backend.data_file, 'w') as data:
+            data.write(";".join(CsvBackend.DATA_HEADER) + "\n")
+            data.write('"Albert";"Camus";"";"";"0123456789"\n')
+            data.write('"Albert";"Camus";"";"";"0611111111"\n')
+
+        with self.assertLogs('tact.storage', 'WARNING') as logs:
+            address_book = AddressBookManager.make_address_book()
+        self.assertIn("0611111111", logs.output[0])
+        self.assertEqual(
+            address_book.find_contact("Albert", "Camus").phones,
+            ("0123456789",))
+
+    def test_cache(self):
+        """ Test loading the book from the binary cache while the CSV file is
+        unchanged. """
+        address_book = AddressBookManager.make_address_book()
+        address_book.add_contact(
+            "Albert", "Einstein", "1 rue de Troy",
+            ["albert@test.fr"], ["0123456789"])
+        self.backend.write_snapshot(address_book)
+        self.assertTrue(os.path.exists(self.backend.cache_file))
+
+        with mock.patch.object(
+                ContactFactory, 'make_contact',
+                wraps=ContactFactory.make_contact) as make_contact:
+            self.assertEqual(
+                AddressBookManager.make_address_book().export_data(),
+                address_book.export_data())
+            self.assertEqual(make_contact.call_count, 0)
+
+            # The CSV file is edited by hand: the cache is rebuilt
+            with open(self.backend.data_file, 'a') as data:
+                data.write('"Albert";"Camus";"";"";""\n')
+            self.assertEqual(
+                AddressBookManager.make_address_book().get_nb_contacts(), 2)
+            self.assertEqual(make_contact.call_count, 2)
+            self.assertEqual(
+                AddressBookManager.make_address_book().get_nb_contacts(), 2)
+            self.assertEqual(make_contact.call_count, 2)
+
+        # Another reader has rebuilt the cache meanwhile
+        with open(self.backend.data_file, 'a') as data:
+            data.write('"Marie";"Curie";"";"";""\n')
+        with mock.patch('os.replace', side_effect=FileNotFoundError):
+            self.assertEqual(
+                AddressBookManager.make_address_book().get_nb_contacts(), 3)
+        self.assertEqual(
+            sorted(os.listdir(self.backend.data_dir)),
+            ['tact.cache', 'tact.csv', 'tact.lock'])
+
+    def test_lock(self):
+        """ Test readers sharing the lock and a writer holding it alone. """
+        with self.backend.lock(exclusive=True):
+            pass
+
+        with self.backend.lock(), open(self.backend.lock_file) as other:
+            fcntl.flock(other, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            fcntl.flock(other, fcntl.LOCK_UN)
+            with self.assertRaises(BlockingIOError):
+                fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def test_conflict(self):
+        """ Test concurrent saves, the last one being applied again on the
+        book saved by the first one. """
+        address_book = AddressBookManager.make_address_book()
+        address_book.add_contact("Albert", "Camus")
+        AddressBookManager.save_address_book(address_book)
+
+        first_book = AddressBookManager.make_address_book()
+        last_book = AddressBookManager.make_address_book()
+        first_book.add_contact_phone("Albert", "Camus", "0123456789")
+        last_book.add_contact_email("Albert", "Camus", "albert@test.fr")
+        last_book.add_contact("Marie", "Curie")
+        AddressBookManager.save_address_book(first_book)
+
+        with self.assertLogs('tact.core', 'WARNING'):
+            saved_book = AddressBookManager.save_address_book(last_book)
+        self.assertFalse(saved_book.is_dirty())
+        self.assertEqual(saved_book.version, self.backend.read_version())
+
+        address_book = AddressBookManager.make_address_book()
+        contact = address_book.find_contact("Albert", "Camus")
+        self.assertEqual(contact.phones, ("0123456789",))
+        self.assertEqual(contact.emails, ("albert@test.fr",))
+        self.assertIsNotNone(address_book.find_contact("Marie", "Curie"))
+
+    def test_concurrent_saves(self):
+        """ Test processes saving at the same time, none of their changes
+        being lost. """
+        def add_contacts(worker):
+            logging.disable(logging.WARNING)
+            for i in range(25):
+                address_book = AddressBookManager.make_address_book()
+                address_book.add_contact(
+                    "Firstname{}".format(worker), "Lastname{}".format(i))
+                AddressBookManager.save_address_book(address_book)
+
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=add_contacts, args=(worker,))
+            for worker in range(12)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual(
+            [process.exitcode for process in processes], [0] * 12)
+        self.assertEqual(
+            AddressBookManager.make_address_book().get_nb_contacts(), 300)
+
+    def test_shared_strings(self):
+        """ Test repeated mailing addresses, emails and phones being shared
+        by the contacts loaded from the CSV file and from the cache. """
+        address_book = AddressBookManager.make_address_book()
+        for firstname in ("Marie", "Pierre"):
+            address_book.add_contact(
+                firstname, "Curie", "1 rue Pierre et Marie Curie",
+                ["labo@test.fr"], ["0123456789"])
+        self.backend.cache = False
+        self.backend.write_snapshot(address_book)
+
+        for cache in (False, True):
+            self.backend.cache = cache
+            # With the cache enabled, the first load writes it
+            self.backend.make_address_book()
+            marie, pierre = self.backend.make_address_book().book.values()
+            self.assertIs(marie.mailing_address, pierre.mailing_address)
+            self.assertIs(marie.emails[0], pierre.emails[0])
+            self.assertIs(marie.phones[0], pierre.phones[0])
+
 
 class TactcsvTestCase (unittest.TestCase):
 
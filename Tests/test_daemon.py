@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : test_daemon.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import unittest
+import io
+import os
+import time
+import threading
+import contextlib
+
+from tact import cli
+from tact import daemon
+from tact.core import AddressBookManager
+
+import helpers
+
+
+# -----------------------------------------------------------------------------
+#
+# DaemonTestCase class
+#
+# -----------------------------------------------------------------------------
+class DaemonTestCase(unittest.TestCase):
+
+    """ Test commands forwarded to a daemon holding the address book. """
+
+    def setUp(self):
+        self.data_dir = helpers.use_data_dir(self)
+
+    def start_server(self):
+        server = daemon.TactServer(daemon.socket_path(), cli.build_parser())
+        thread = threading.Thread(
+            target=server.serve_forever, kwargs={'poll_interval': 0.01})
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def forward(self, *argv, status=0):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(daemon.forward(list(argv)), status)
+        return output.getvalue()
+
+    def test_forward(self):
+        """ Test running commands in the daemon, saved in the background. """
+        self.assertFalse(daemon.is_running())
+        self.assertIsNone(daemon.forward(['find', 'Albert', 'Camus']))
+
+        self.start_server()
+        self.assertTrue(daemon.is_running())
+
+        self.forward('add', 'Albert', 'Camus', '-p', '0123456789')
+        self.forward('add-email', 'Albert', 'Camus', 'albert@test.fr')
+        self.assertIn(
+            "albert@test.fr", self.forward('find', 'Albert', 'Camus'))
+        self.assertIn(
+            "doesn't exist", self.forward('find', 'Marie', 'Curie'))
+        self.assertIn(
+            "not a correct email address",
+            self.forward('add-email', 'Albert', 'Camus', 'albert'))
+        # A command failing in the daemon fails in the client
+        self.assertIn(
+            "missing.csv",
+            self.forward(
+                'import', os.path.join(self.data_dir, 'missing.csv'),
+                status=2))
+
+        backend = AddressBookManager.get_backend()
+        for _ in range(100):
+            if backend.find('Albert', 'Camus') is not None:
+                break
+            time.sleep(daemon.TactServer.COMMIT_DELAY)
+        self.assertEqual(
+            backend.find('Albert', 'Camus').emails, ("albert@test.fr",))
+
+    def test_exclusive(self):
+        """ Test the commands refused while a daemon is running failing with
+        a nonzero status. """
+        parser = cli.build_parser()
+        self.start_server()
+        with self.assertLogs('tact', 'ERROR'):
+            self.assertEqual(
+                cli.dispatch(parser, parser.parse_args(['compact'])), 1)
+        with self.assertLogs('tact.daemon', 'ERROR'):
+            self.assertEqual(daemon.serve(parser), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : test_dedupe.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import unittest
+
+from tact import dedupe
+from tact.core import AddressBook
+
+
+# -----------------------------------------------------------------------------
+#
+# DedupeTestCase class
+#
+# -----------------------------------------------------------------------------
+class DedupeTestCase(unittest.TestCase):
+
+    """ Test the detection and the merge of duplicate contacts. """
+
+    def setUp(self):
+        self.address_book = AddressBook()
+        self.address_book.add_contact(
+            "Albert", "Einstein", "", [], ["0123456789"])
+        self.address_book.add_contact(
+            "albert ", " EINSTEIN", "1 rue de Troy", ["albert@test.fr"],
+            ["01 23 45 67 89"])
+        self.address_book.add_contact(
+            "Einstein", "Albert", "", ["ALBERT@test.fr"], ["0611111111"])
+        # Same phone, another person
+        self.address_book.add_contact(
+            "Marie", "Curie", "", [], ["0123456789"])
+        self.address_book.add_contact("Pierre", "Curie")
+
+    def test_candidate_pairs(self):
+        """ Test the pairs sharing a name, a phone or an email. """
+        pairs, skipped = dedupe.candidate_pairs(
+            self.address_book.book.values())
+        self.assertEqual(skipped, 0)
+        self.assertEqual(len(pairs), 5)
+        self.assertNotIn((("Marie", "Curie"), ("Pierre", "Curie")), pairs)
+
+        pairs, skipped = dedupe.candidate_pairs(
+            self.address_book.book.values(), max_block_size=2)
+        self.assertEqual(skipped, 2)
+
+    def test_dry_run(self):
+        """ Test a report changing nothing. """
+        self.address_book.mark_clean()
+        duplicates, groups = dedupe.dedupe(self.address_book)
+        self.assertEqual(len(duplicates), 3)
+        self.assertEqual(duplicates[0][0], 1.0)
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(len(groups[0]), 3)
+        self.assertFalse(self.address_book.is_dirty())
+
+    def test_merge(self):
+        """ Test duplicates merged into the contact with an address. """
+        self.address_book.mark_clean()
+        dedupe.dedupe(self.address_book, apply=True)
+
+        self.assertEqual(len(self.address_book.book), 3)
+        kept = self.address_book.find_contact("albert ", " EINSTEIN")
+        self.assertEqual(kept.phones, ("01 23 45 67 89", "0611111111"))
+        self.assertEqual(kept.emails, ("albert@test.fr",))
+        self.assertEqual(
+            self.address_book.find_by_phone("0611111111"), [kept])
+        self.assertEqual(
+            [change[0] for change in self.address_book.changes],
+            ['remove_contact', 'add_phone', 'remove_contact'])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : test_export.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import unittest
+import io
+import os
+import json
+import tempfile
+import shutil
+
+from tact import export
+from tact import importer
+from tact.core import AddressBook
+
+
+# -----------------------------------------------------------------------------
+#
+# ExportTestCase class
+#
+# -----------------------------------------------------------------------------
+class ExportTestCase(unittest.TestCase):
+
+    """ Test streaming export of contacts. """
+
+    def setUp(self):
+        self.address_book = AddressBook()
+        self.address_book.add_contact(
+            "Albert", "Camus", "1 rue de Troy, Paris",
+            ["albert@test.fr"], ["0123456789"])
+        self.address_book.add_contact_email(
+            "Albert", "Camus", "camus@test.fr")
+        self.address_book.add_contact("Marie", "Curie")
+
+    def test_export_jsonl(self):
+        """ Test exporting to JSON Lines and importing back. """
+        data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, data_dir)
+        path = os.path.join(data_dir, 'contacts.jsonl')
+
+        export.export_file(
+            iter(self.address_book.book.values()), 'jsonl', path)
+
+        with open(path, encoding='utf-8') as data:
+            records = [json.loads(line) for line in data]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(
+            records[0]['emails'], ["albert@test.fr", "camus@test.fr"])
+
+        address_book = AddressBook()
+        report = importer.import_file(address_book, path, jobs=1)
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(
+            address_book.find_contact("Albert", "Camus").export_data(),
+            self.address_book.find_contact("Albert", "Camus").export_data())
+
+    def test_export_vcard(self):
+        """ Test exporting to vCard, with escaped values. """
+        output = io.StringIO()
+
+        export.export(self.address_book.book.values(), 'vcard', output)
+
+        cards = output.getvalue().split("END:VCARD\r\n")
+        self.assertEqual(len(cards), 3)
+        self.assertIn("N:Camus;Albert;;;\r\n", cards[0])
+        self.assertIn("ADR:;;1 rue de Troy\\, Paris;;;;\r\n", cards[0])
+        self.assertIn("TEL:0123456789\r\n", cards[0])
+        self.assertIn("EMAIL;TYPE=INTERNET:camus@test.fr\r\n", cards[0])
+        self.assertNotIn("ADR", cards[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF
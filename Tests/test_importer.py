@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : test_importer.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import unittest
+import os
+import json
+import tempfile
+import shutil
+
+from tact import importer
+from tact.core import AddressBook
+
+
+# -----------------------------------------------------------------------------
+#
+# ImporterTestCase class
+#
+# -----------------------------------------------------------------------------
+class ImporterTestCase(unittest.TestCase):
+
+    """ Test bulk import of contacts. """
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+        self.address_book = AddressBook()
+        self.address_book.add_contact("Albert", "Einstein")
+        self.address_book.mark_clean()
+
+    def write(self, name, lines):
+        path = os.path.join(self.data_dir, name)
+        with open(path, 'w', encoding='utf-8') as data:
+            data.write("\n".join(lines) + "\n")
+        return path
+
+    def test_import_csv(self):
+        """ Test importing a CSV file with a pool of workers. """
+        path = self.write('contacts.csv', [
+            '"Firstname";"Lastname";"Home Address";"Emails";"Phones"',
+            '"Albert";"Einstein";"";"";""',
+            '"Albert";"Camus";"1 rue de Troy";"albert@test.fr";"0123456789"',
+            '"Albert";"Camus";"";"";""',
+            '"Marie";"Curie";"";"not an email";""',
+            '"";"Nobody";"";"";""',
+        ] + ['"First{0}";"Last{0}";"";"";""'.format(i) for i in range(100)])
+
+        report = importer.import_file(self.address_book, path, jobs=2)
+
+        self.assertEqual(report['rows'], 105)
+        self.assertEqual(report['imported'], 101)
+        self.assertEqual(report['rejected'], 2)
+        self.assertEqual(report['duplicates'], 2)
+        self.assertEqual(self.address_book.get_nb_contacts(), 102)
+        self.assertEqual(len(self.address_book.created), 101)
+        self.assertEqual(
+            self.address_book.find_contact("Albert", "Camus").phones,
+            ("0123456789",))
+
+    def test_import_jsonl(self):
+        """ Test importing a JSON Lines file in process. """
+        path = self.write('contacts.jsonl', [
+            json.dumps({
+                'firstname': "Marie", 'lastname': "Curie",
+                'emails': ["marie@test.fr"], 'phones': ["01 23 45 67 89"]}),
+            json.dumps({'firstname': "Pierre", 'lastname': "Curie"}),
+            json.dumps({'firstname': "Pierre"}),
+            '{not json',
+            json.dumps({'firstname': "A", 'lastname': "B", 'phones': [123]}),
+            json.dumps({'firstname': 1, 'lastname': "B"}),
+        ])
+
+        report = importer.import_file(self.address_book, path, jobs=1)
+
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(report['rejected'], 4)
+        self.assertEqual(
+            self.address_book.find_by_phone("0123456789"),
+            [self.address_book.find_contact("Marie", "Curie")])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : test_mmapstore.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import unittest
+import os
+
+from unittest import mock
+
+from tact.core import AddressBookManager
+from tact.core import Contact
+from tact.mmapstore import MmapStore
+
+import helpers
+
+
+# -----------------------------------------------------------------------------
+#
+# MmapStoreTestCase class
+#
+# -----------------------------------------------------------------------------
+class MmapStoreTestCase(unittest.TestCase):
+
+    """ Test MmapStore class and the mmap backend of AddressBookManager. """
+
+    def setUp(self):
+        data_dir = helpers.use_data_dir(self)
+        self.backend = AddressBookManager.get_backend('csv')
+        self.store = MmapStore(data_dir)
+
+        # Fill a CSV address book
+        address_book = helpers.make_address_book()
+        self.backend.write_snapshot(address_book)
+        self.expected = sorted(address_book.export_data())
+
+    def test_find(self):
+        """ Test finding contacts with a binary search on the index. """
+        AddressBookManager.convert('mmap')
+
+        contact = self.store.find("Firstname7", "Lastname7")
+        self.assertEqual(contact, Contact("Firstname7", "Lastname7"))
+        self.assertEqual(contact.emails, ("first8@test.fr",))
+        self.assertIsNone(self.store.find("Firstname7", "Lastname8"))
+        self.assertEqual(
+            sorted(contact.export_data()
+                   for contact in self.store.iter_contacts()),
+            self.expected)
+
+    def test_update(self):
+        """ Test persisting changes without loading the whole book. """
+        AddressBookManager.convert('mmap')
+
+        with mock.patch.object(AddressBookManager, 'BACKEND', 'mmap'):
+            address_book = AddressBookManager.make_address_book()
+            address_book.add_contact_phone(
+                "Firstname7", "Lastname7", "0123456789")
+            self.assertEqual(len(address_book.book), 1)
+            index_size = os.path.getsize(self.store.index_file)
+            AddressBookManager.save_address_book(address_book)
+            self.assertEqual(
+                os.path.getsize(self.store.index_file), index_size)
+
+            address_book = AddressBookManager.make_address_book()
+            address_book.remove_contact("Firstname8", "Lastname8")
+            address_book.add_contact("Albert", "Einstein")
+            address_book.add_contact("Firstname9", "Lastname9")
+            AddressBookManager.save_address_book(address_book)
+
+            self.assertEqual(
+                AddressBookManager.find_contact(
+                    "Firstname7", "Lastname7").phones,
+                ("0123456789",))
+            self.assertIsNone(
+                AddressBookManager.find_contact("Firstname8", "Lastname8"))
+            self.assertIsNotNone(
+                AddressBookManager.find_contact("Albert", "Einstein"))
+            self.assertEqual(
+                AddressBookManager.make_address_book().get_nb_contacts(), 50)
+
+            AddressBookManager.compact()
+            self.assertEqual(
+                AddressBookManager.make_address_book().get_nb_contacts(), 50)
+
+        # Back to CSV
+        os.remove(self.backend.data_file)
+        AddressBookManager.convert('csv', 'mmap')
+        data = AddressBookManager.make_address_book().export_data()
+        self.assertEqual(len(data), 50)
+        self.assertIn(
+            ["Firstname7", "Lastname7", "7 rue de Troy",
+             "first8@test.fr", "0123456789"],
+            data)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : test_shardstore.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import unittest
+import os
+
+from unittest import mock
+
+from tact.core import AddressBookManager
+from tact.core import Contact
+from tact.shardstore import ShardedBackend
+
+import helpers
+
+
+# -----------------------------------------------------------------------------
+#
+# ShardedBackendTestCase class
+#
+# -----------------------------------------------------------------------------
+class ShardedBackendTestCase(unittest.TestCase):
+
+    """ Test ShardedBackend class and the sharded backend of
+    AddressBookManager. """
+
+    def setUp(self):
+        self.data_dir = helpers.use_data_dir(self, SHARDS=4, WORKERS=1)
+
+        # Fill a CSV address book
+        address_book = helpers.make_address_book()
+        AddressBookManager.get_backend('csv').write_snapshot(address_book)
+        self.expected = sorted(address_book.export_data())
+
+    def test_reshard(self):
+        """ Test splitting a CSV address book, then the shards again. """
+        AddressBookManager.reshard(4)
+        store = AddressBookManager.get_backend('sharded')
+        self.assertEqual(store.read_nb_shards(), 4)
+        self.assertEqual(len(list(store.iter_shards())), 4)
+        self.assertEqual(
+            store.find("Firstname7", "Lastname7"),
+            Contact("Firstname7", "Lastname7"))
+        self.assertIsNone(store.find("Firstname7", "Lastname8"))
+
+        AddressBookManager.reshard(2, 'sharded')
+        store = AddressBookManager.get_backend('sharded')
+        self.assertEqual(store.nb_shards, 2)
+        self.assertFalse(os.path.exists(store.get_shard(3).data_dir))
+        self.assertEqual(
+            sorted(contact.export_data()
+                   for contact in store.iter_contacts()),
+            self.expected)
+
+    def test_update(self):
+        """ Test a change rewriting the shard of its contact only. """
+        AddressBookManager.reshard(4)
+
+        with mock.patch.object(AddressBookManager, 'BACKEND', 'sharded'):
+            address_book = AddressBookManager.make_address_book()
+            self.assertEqual(
+                sorted(address_book.export_data()), self.expected)
+            address_book.add_contact_phone(
+                "Firstname7", "Lastname7", "0123456789")
+            with mock.patch.object(
+                    ShardedBackend, 'get_shard',
+                    autospec=True,
+                    side_effect=ShardedBackend.get_shard) as get_shard:
+                AddressBookManager.save_address_book(address_book)
+            self.assertEqual(
+                [call[0][1] for call in get_shard.call_args_list],
+                [ShardedBackend.shard_of("Lastname7", 4)])
+
+            self.assertEqual(
+                AddressBookManager.find_contact(
+                    "Firstname7", "Lastname7").phones,
+                ("0123456789",))
+
+    def test_parallel_load(self):
+        """ Test loading the shards in worker processes. """
+        AddressBookManager.reshard(4)
+
+        store = ShardedBackend(self.data_dir, workers=2)
+        address_book = store.make_address_book()
+        self.assertEqual(sorted(address_book.export_data()), self.expected)
+        self.assertEqual(
+            address_book.find_contact("Firstname7", "Lastname7").emails,
+            ("first8@test.fr",))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF
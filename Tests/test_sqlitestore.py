@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : test_sqlitestore.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from tact.core import AddressBookManager
+from tact.core import Contact
+
+import helpers
+
+
+# -----------------------------------------------------------------------------
+#
+# SqliteStoreTestCase class
+#
+# -----------------------------------------------------------------------------
+class SqliteStoreTestCase(unittest.TestCase):
+
+    """ Test SqliteStore class through AddressBookManager. """
+
+    def setUp(self):
+        helpers.use_data_dir(self, BACKEND='sqlite')
+
+        # Migrate a CSV address book
+        address_book = helpers.make_address_book(phones=True)
+        AddressBookManager.get_backend('csv').write_snapshot(address_book)
+        AddressBookManager.convert('sqlite', 'csv')
+        self.expected = address_book.export_data()
+
+    def test_migrate(self):
+        """ Test migrating the CSV file into the database. """
+        self.assertEqual(
+            [contact.export_data()
+             for contact in AddressBookManager.iter_contacts()],
+            self.expected)
+
+        contact = AddressBookManager.find_contact("Firstname7", "Lastname7")
+        self.assertEqual(contact.phones, ("01 23 45 67 07",))
+        self.assertEqual(contact.emails, ("first8@test.fr",))
+        self.assertIsNone(
+            AddressBookManager.find_contact("Firstname7", "Lastname8"))
+
+    def test_lookup(self):
+        """ Test reverse lookups answered by the database indexes. """
+        address_book = AddressBookManager.make_address_book()
+        self.assertEqual(
+            address_book.find_by_phone("0123456707"),
+            [Contact("Firstname7", "Lastname7")])
+        self.assertEqual(
+            address_book.find_by_email("FIRST8@test.fr"),
+            [Contact("Firstname7", "Lastname7")])
+        self.assertEqual(len(address_book.book), 1)
+
+        # Showing the book does not load it
+        self.assertIn("1 contacts loaded from SqliteStore", repr(address_book))
+        self.assertEqual(len(address_book.book), 1)
+
+    def test_update(self):
+        """ Test persisting the changes of an address book. """
+        address_book = AddressBookManager.make_address_book()
+        address_book.add_contact_phone(
+            "Firstname7", "Lastname7", "0611223344")
+        address_book.remove_contact_email(
+            "Firstname7", "Lastname7", "first8@test.fr")
+        address_book.remove_contact("Firstname8", "Lastname8")
+        address_book.add_contact("Albert", "Einstein", emails=["a@test.fr"])
+        AddressBookManager.save_address_book(address_book)
+
+        address_book = AddressBookManager.make_address_book()
+        contact = address_book.find_contact("Firstname7", "Lastname7")
+        self.assertEqual(contact.phones, ("01 23 45 67 07", "0611223344"))
+        self.assertEqual(contact.emails, ())
+        self.assertIsNone(address_book.find_contact("Firstname8", "Lastname8"))
+        self.assertEqual(
+            address_book.find_by_email("a@test.fr"),
+            [Contact("Albert", "Einstein")])
+        self.assertEqual(address_book.get_nb_contacts(), 50)
+
+        AddressBookManager.compact()
+        self.assertEqual(
+            AddressBookManager.make_address_book().get_nb_contacts(), 50)
+
+    def test_threads(self):
+        """ Test a book read from a thread and saved from another one, each
+        through its own connection. """
+        address_book = AddressBookManager.make_address_book()
+        address_book.add_contact("Albert", "Einstein")
+        store = address_book.source
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertIsNot(
+                executor.submit(store.connect).result(), store.connect())
+            executor.submit(
+                AddressBookManager.save_address_book, address_book).result()
+        self.assertIsNotNone(store.find("Albert", "Einstein"))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF
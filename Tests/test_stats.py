@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : test_stats.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import unittest
+import io
+import time
+
+from unittest import mock
+
+from tact import stats
+from tact.core import AddressBook
+from tact.core import AddressBookManager
+
+import helpers
+
+
+# -----------------------------------------------------------------------------
+#
+# StatsTestCase class
+#
+# -----------------------------------------------------------------------------
+class StatsTestCase(unittest.TestCase):
+
+    """ Test the phases timed and the work counted along a command. """
+
+    def setUp(self):
+        stats.reset()
+        self.addCleanup(stats.reset)
+        patcher = mock.patch.object(stats, 'ENABLED', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_timed(self):
+        """ Test nested phases left out of the phase around them. """
+        start = time.perf_counter()
+        with stats.timed('execute'):
+            with stats.timed('load'):
+                time.sleep(0.01)
+            with stats.timed('save'):
+                time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(list(stats.TIMES), ['load', 'save', 'execute'])
+        self.assertLess(stats.TIMES['execute'], 0.01)
+        self.assertAlmostEqual(
+            sum(stats.TIMES.values()), elapsed, delta=0.001)
+
+        output = io.StringIO()
+        stats.report(output)
+        self.assertIn("total", output.getvalue())
+
+    def test_counters(self):
+        """ Test the rows, validations and bytes counted by a save and a
+        load. """
+        helpers.use_data_dir(self, JOURNAL=False, CACHE=False)
+
+        address_book = AddressBook()
+        address_book.add_contact(
+            "Albert", "Camus", "", ["albert@test.fr"], ["0123456789", "12"])
+        address_book.add_contact("Marie", "Curie")
+        AddressBookManager.save_address_book(address_book)
+        self.assertEqual(stats.COUNTERS['validations'], 3)
+        self.assertGreater(stats.COUNTERS['bytes written'], 0)
+
+        stats.reset()
+        AddressBookManager.make_address_book()
+        self.assertEqual(stats.COUNTERS['rows parsed'], 2)
+        self.assertEqual(stats.COUNTERS['validations'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# _*_ coding: utf-8 _*_
+
+###
+# Project          : Tact
+# FileName         : test_util.py
+# -----------------------------------------------------------------------------
+# Author           : Nicolas Deutschmann
+# E-Mail           : nicolas.deutschmann@abase.fr
+##
+
+import unittest
+import os
+import atexit
+import logging
+import logging.handlers
+import tempfile
+import shutil
+
+from tact import util
+
+
+# -----------------------------------------------------------------------------
+#
+# LoggingTestCase class
+#
+# -----------------------------------------------------------------------------
+class LoggingTestCase(unittest.TestCase):
+
+    """ Test the queued log file and the rate limited messages. """
+
+    def test_rate_limit(self):
+        """ Test repeated messages dropped beyond the burst. """
+        logger = logging.getLogger('tact.test.rate')
+        logger.addFilter(util.RateLimitFilter(burst=2, period=60))
+
+        with self.assertLogs(logger, 'ERROR') as logs:
+            for value in range(5):
+                logger.error("%s is not a phone number.", value)
+            logger.error("Another message.")
+        self.assertEqual(logs.records[-1].getMessage(), "Another message.")
+        self.assertEqual(len(logs.records), 3)
+
+        # The next period tells how many have been dropped
+        logger.filters[0].period = 0
+        with self.assertLogs(logger, 'ERROR') as logs:
+            logger.error("%s is not a phone number.", 5)
+        self.assertEqual(
+            logs.records[0].getMessage(),
+            "5 is not a phone number. (3 similar messages dropped)")
+
+    def test_queue_file_handlers(self):
+        """ Test file handlers moved behind a queue. """
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_dir)
+        log_file = os.path.join(log_dir, 'tact.log')
+
+        logger = logging.getLogger('tact.test.queue')
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        handler = logging.FileHandler(log_file)
+        handler.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        self.addCleanup(handler.close)
+
+        listeners = util.queue_file_handlers()
+        self.assertIsInstance(
+            logger.handlers[0], logging.handlers.QueueHandler)
+        logger.info("Written %s", "later")
+        logger.debug("Dropped")
+        for listener in listeners:
+            listener.stop()
+            atexit.unregister(listener.stop)
+
+        with open(log_file, encoding='utf-8') as log:
+            self.assertEqual(log.read(), "Written later\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF
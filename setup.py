@@ -62,7 +62,7 @@ setup(
     ],
     install_requires=[],
     data_files=[
-        ('Config', ['Config/logging.conf']),
+        ('Config', ['Config/logging.conf', 'Config/tact.conf']),
     ],
     test_suite='nose.collector',
     tests_require=['nose>=1.3.0'],